@@ -0,0 +1,186 @@
+'''
+benchmarks for every encoder exported by knuckles.
+
+each case runs one encoder on random data of a given size and shape in a
+fresh process, timing its stages
+  prepare : mapping the data and building the sonification
+  compile : flattening the sonification into voices
+  render  : synthesising and mixing the blocks
+  encode  : converting the blocks to pcm and writing them
+together with the frames per second of the whole render and the peak rss.
+blocks are rendered and encoded one at a time, as in a render, and encoders
+taking spectral are run both in the time domain and through spectral banks.
+
+  python benchmarks/bench.py --sizes 100 1000 --shapes sine heart --output results.json
+  python benchmarks/bench.py --baseline baseline.json
+
+results are written as json, and compared against a baseline if one is
+given, listing the cases which got slower by more than the tolerance.
+'''
+
+import argparse
+import inspect
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import knuckles
+from knuckles import encryptor
+from knuckles import wave as wv
+from knuckles.wavfile import WavWriter
+
+_sizes = [10**2, 10**3, 10**4, 10**5, 10**6]
+_maxseconds = 60 # longest stretch of audio rendered per case
+_tolerance = 0.2 # relative slowdown flagged as a regression
+
+## cases
+
+def encoders():
+  # every function exported by knuckles
+  return sorted(name for name, f in vars(knuckles).items() if inspect.isfunction(f) and f.__module__ == encryptor.__name__)
+
+def arguments(name, size, rng):
+  # random data for every argument the encoder takes without a default
+  args = []
+  for p in inspect.signature(getattr(knuckles, name)).parameters.values():
+    if p.default is not p.empty:
+      break
+    if p.name.endswith('datasets'):
+      args.append([rng.normal(size=size//2) for _ in range(2)])
+    elif p.name.startswith('sonif'):
+      args.append(knuckles.nulvar_sq_time(rng.normal(size=size//2), write=False))
+    else:
+      args.append(rng.normal(size=size))
+  return args
+
+def peak_rss():
+  # in megabytes, ru_maxrss is counted in kilobytes on linux and bytes on macos
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return rss / (1 << 20) if sys.platform == 'darwin' else rss / (1 << 10)
+
+def run_case(name, size, shape, spectral, maxseconds, queue):
+  rng = np.random.default_rng(size)
+  encoder = getattr(knuckles, name)
+  kwargs = {'write':False}
+  if shape is not None:
+    kwargs['shape'] = shape
+  if spectral:
+    kwargs['spectral'] = True
+  stages = {}
+
+  start = time.perf_counter()
+  sonif = encoder(*arguments(name, size, rng), **kwargs)
+  stages['prepare'] = time.perf_counter() - start
+
+  start = time.perf_counter()
+  voices = list(sonif.voices())
+  stages['compile'] = time.perf_counter() - start
+
+  # blocks are rendered and encoded one at a time, as a render does, so that the peak rss
+  # is that of the streaming pipeline, the time of each stage adding up over the blocks
+  nframes = int(min(sonif.duration, maxseconds) * wv._framerate)
+  stages['render'] = stages['encode'] = 0
+  with tempfile.TemporaryFile() as f:
+    start = time.perf_counter()
+    blocks = wv.compute_blocks(voices, nframes, spectral=sonif.spectral, ordered=True)
+    writer = WavWriter(f, nchannels=2, framerate=wv._framerate, nframes=nframes)
+    stages['render'] += time.perf_counter() - start
+    while True:
+      start = time.perf_counter()
+      block = next(blocks, None)
+      stages['render'] += time.perf_counter() - start
+      if block is None:
+        break
+      start = time.perf_counter()
+      writer.write(block)
+      stages['encode'] += time.perf_counter() - start
+    start = time.perf_counter()
+    writer.close()
+    stages['encode'] += time.perf_counter() - start
+
+  total = sum(stages.values())
+  queue.put({
+    'function':name, 'size':size, 'shape':shape, 'spectral':spectral, 'stages':stages, 'total':total,
+    'voices':len(voices), 'frames':nframes, 'frames_per_second':nframes / total,
+    'peak_rss_mb':peak_rss(),
+    })
+
+def run(name, size, shape, spectral, maxseconds):
+  # every case gets a process of its own, so that its peak rss is its own
+  queue = multiprocessing.Queue()
+  process = multiprocessing.Process(target=run_case, args=(name, size, shape, spectral, maxseconds, queue))
+  process.start()
+  process.join()
+  if process.exitcode != 0:
+    return {'function':name, 'size':size, 'shape':shape, 'spectral':spectral, 'error':f'exit code {process.exitcode}'}
+  return queue.get()
+
+## comparison
+
+def key(result):
+  # results from before spectral cases were tracked are time domain ones
+  return (result['function'], result['size'], result['shape'], result.get('spectral', False))
+
+def regressions(results, baseline, tolerance):
+  before = {key(r):r for r in baseline if 'error' not in r}
+  slower = []
+  for r in results:
+    if 'error' in r or key(r) not in before:
+      continue
+    ratio = r['total'] / before[key(r)]['total']
+    if ratio > 1 + tolerance:
+      slower.append((r, ratio))
+  return slower
+
+def main(argv = None):
+  parser = argparse.ArgumentParser(description='benchmark the knuckles encoders')
+  parser.add_argument('--functions', nargs='*', default=None, help='encoders to run, all by default')
+  parser.add_argument('--sizes', nargs='*', type=lambda s: int(float(s)), default=_sizes)
+  parser.add_argument('--shapes', nargs='*', default=sorted(wv._wvshapes))
+  parser.add_argument('--max-seconds', type=float, default=_maxseconds, help='longest stretch of audio rendered per case')
+  parser.add_argument('--output', default='bench_results.json')
+  parser.add_argument('--baseline', default=None, help='results to compare against')
+  parser.add_argument('--tolerance', type=float, default=_tolerance)
+  args = parser.parse_args(argv)
+
+  results = []
+  for name in args.functions or encoders():
+    # diff and a few cmp_* encoders have no shape of their own
+    parameters = inspect.signature(getattr(knuckles, name)).parameters
+    shapes = args.shapes if 'shape' in parameters else [None]
+    # the *_ns encoders are also run through their spectral banks
+    modes = [False, True] if 'spectral' in parameters else [False]
+    for size in args.sizes:
+      for shape in shapes:
+        for spectral in modes:
+          result = run(name, size, shape, spectral, args.max_seconds)
+          results.append(result)
+          label = f'{name:30} {size:>8} {str(shape):7} {"spectral" if spectral else "time":8}'
+          if 'error' in result:
+            print(f'{label} {result["error"]}', flush=True)
+            continue
+          stages = ' '.join(f'{stage} {t:8.3f}s' for stage, t in result['stages'].items())
+          print(f'{label} {stages} {result["frames_per_second"]:12.0f} frames/s {result["peak_rss_mb"]:8.1f} MB', flush=True)
+
+  with open(args.output, 'w') as f:
+    json.dump(results, f, indent=1)
+
+  if args.baseline is not None:
+    with open(args.baseline) as f:
+      slower = regressions(results, json.load(f), args.tolerance)
+    for r, ratio in slower:
+      print(f'regression: {r["function"]} size {r["size"]} shape {r["shape"]}{" spectral" if r.get("spectral") else ""} is {ratio:.2f} times slower')
+    if slower:
+      return 1
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
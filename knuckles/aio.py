@@ -0,0 +1,79 @@
+import asyncio
+import functools
+import threading
+
+from . import encryptor
+from . import wave as wv
+from .wavfile import _bufsize, framesize, header, pcm
+
+## asyncio rendering
+  ## synthesis runs in an executor a chunk of blocks at a time, so the event loop stays free,
+  ## finished bytes can be sent on while the rest renders, and cancelling stops the render
+  ## as soon as the chunk at hand is done
+  ## the executor needs to be a thread pool, as the render is a generator living in this process
+
+def _chunk(blocks, lock, sampformat, size):
+  # pcm bytes of the next blocks, at least size of them unless the render ends, None once it has
+  data = bytearray()
+  with lock:
+    for block in blocks:
+      data += pcm(block, sampformat).data
+      if len(data) >= size:
+        break
+  return bytes(data) if data else None
+
+def _close(blocks, lock):
+  # waits for a chunk which is still rendering in another thread
+  with lock:
+    blocks.close()
+
+async def stream(sonif, sampformat = 'int16', executor = None, chunksize = None, framerate = None, harmonics = None, mono = False, preview = False, normalize = None):
+  # asynchronous iterator over the bytes of the wav file of a sonification, header first
+  # executor : thread pool doing the synthesis, the default executor of the loop if None
+  # chunksize : bytes rendered in one go, which bounds how long a cancellation waits
+  # framerate, harmonics, mono, preview : see Sonification.settings
+  # normalize : None to clip or 'limit', see wave.write, peaks are not known until the end
+  if normalize == 'peak':
+    raise ValueError('Streams are normalized by a limiter, not by their peak.')
+  loop = asyncio.get_event_loop()
+  chunksize = _bufsize if chunksize is None else chunksize
+  framerate, harmonics, nchannels = sonif.settings(framerate, harmonics, mono, preview)
+  nframes = int(sonif.duration * framerate)
+  blocks = wv.mixed(sonif.voices(framerate, harmonics), nframes, sonif.spectral, True, nchannels, normalize)
+  lock = threading.Lock()
+  try:
+    yield header(nframes, nchannels, framerate, sampformat)
+    while True:
+      data = await loop.run_in_executor(executor, _chunk, blocks, lock, sampformat, chunksize)
+      if data is None:
+        break
+      yield data
+    if nframes * framesize(nchannels, sampformat) % 2:
+      yield b'\x00'
+  finally:
+    # let go of the render in the executor, so a cancelled chunk does not hold the loop
+    loop.run_in_executor(executor, _close, blocks, lock)
+
+async def render(sonif, filename = None, sampformat = 'int16', executor = None, **settings):
+  # render a sonification into {filename}.wav without blocking the event loop
+  # settings : framerate, harmonics, mono, preview and normalize, as for stream
+  loop = asyncio.get_event_loop()
+  if filename is not None:
+    sonif.filename = filename
+  with open(f'{sonif.filename}.wav', 'wb') as f:
+    async for data in stream(sonif, sampformat=sampformat, executor=executor, **settings):
+      await loop.run_in_executor(executor, f.write, data)
+  return sonif
+
+async def encode(encoder, *args, write = True, executor = None, sampformat = 'int16', framerate = None, harmonics = None, mono = False, preview = False, normalize = None, **kwargs):
+  # run an encoder, given as a function or by name, mapping the data in the executor
+  # and rendering as render does if write, returns the sonification
+  # framerate, harmonics, mono, preview, normalize : settings of the render, as for stream
+  # kwargs : keyword arguments of the encoder
+  if isinstance(encoder, str):
+    encoder = getattr(encryptor, encoder)
+  loop = asyncio.get_event_loop()
+  sonif = await loop.run_in_executor(executor, functools.partial(encoder, *args, write=False, **kwargs))
+  if write:
+    await render(sonif, sampformat=sampformat, executor=executor, framerate=framerate, harmonics=harmonics, mono=mono, preview=preview, normalize=normalize)
+  return sonif
@@ -0,0 +1,79 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import encryptor
+from . import metrics as mt
+
+## batch rendering
+  ## many sonifications rendered in one call, spread over a pool of processes which
+  ## each keep their wavetables, envelopes and grains from one job to the next
+
+def _encoder(encoder):
+  # encoders may be given by name, which is cheaper to send to a worker
+  if isinstance(encoder, str):
+    try:
+      return getattr(encryptor, encoder)
+    except AttributeError:
+      raise ValueError(f'Unknown encoder {encoder}.') from None
+  return encoder
+
+def _run(index, encoder, data, params, filename, cache, recording):
+  # render a single job, reporting rather than raising whatever goes wrong
+  result = {'index':index, 'filename':None, 'seconds':None, 'metrics':None, 'error':None}
+  start = time.perf_counter()
+  try:
+    encoder = _encoder(encoder)
+    if recording:
+      with mt.record() as metrics:
+        result['filename'] = _render(encoder, data, params, filename, cache)
+      result['metrics'] = metrics.as_dict()
+    else:
+      result['filename'] = _render(encoder, data, params, filename, cache)
+  except Exception:
+    result['error'] = traceback.format_exc()
+  result['seconds'] = time.perf_counter() - start
+  return result
+
+def _render(encoder, data, params, filename, cache):
+  if filename is None:
+    filename = encoder.__name__
+  if cache is not None:
+    return cache.render(encoder, *data, filename=filename, **params)
+  encoder(*data, filename=filename, write=True, **params)
+  return f'{filename}.wav'
+
+def render_batch(jobs, workers = None, callback = None, cache = None):
+  # jobs : iterable of (encoder, data, params, filename), where the encoder is a function
+  #   or the name of one in encryptor, data the tuple of its positional arguments, params
+  #   a dict of keyword arguments or None and filename where to write, without extension
+  # workers : number of processes, all cpus by default, in this process if one
+  # callback : function called with each result as soon as it is done, results are then recorded
+  # cache : RenderCache shared by the jobs
+  # returns a result for every job in order, a dict holding
+  #   filename, seconds, metrics and error, which is the traceback of a failed job or None
+  jobs = [(encoder, tuple(data), dict(params or {}), filename) for encoder, data, params, filename in jobs]
+  workers = os.cpu_count() if workers is None else workers
+  recording = callback is not None
+  results = [None] * len(jobs)
+
+  def done(result):
+    results[result['index']] = result
+    if callback is not None:
+      callback(result)
+
+  if workers <= 1 or len(jobs) <= 1:
+    for index, job in enumerate(jobs):
+      done(_run(index, *job, cache, recording))
+    return results
+
+  with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+    futures = {pool.submit(_run, index, *job, cache, recording):index for index, job in enumerate(jobs)}
+    for future in as_completed(futures):
+      try:
+        done(future.result())
+      except Exception:
+        # the job could not reach its worker or come back, such as data which cannot be pickled
+        done({'index':futures[future], 'filename':None, 'seconds':None, 'metrics':None, 'error':traceback.format_exc()})
+  return results
@@ -0,0 +1,126 @@
+import hashlib
+import numbers
+import os
+import shutil
+
+import numpy as np
+
+from . import wave as wv
+from .source import Chunked
+
+try:
+  import fcntl
+except ImportError: # not on posix, eviction goes without a lock
+  fcntl = None
+
+_version = 1 # bump whenever the same arguments would start to sound different
+_maxsize = 1 << 30 # bytes kept on disk by default
+
+## content addressed cache of rendered sonifications
+  ## a render is stored under a hash of the encoder, its arguments and the data,
+  ## so asking for the same sonification again only copies the stored file
+
+def _digest(h, value):
+  # feed a value into a hash, data by its contents and anything else by its repr
+  if isinstance(value, Chunked):
+    h.update(b'chunked')
+    for chunk in value.chunks():
+      h.update(chunk.tobytes())
+  elif isinstance(value, np.ndarray):
+    h.update(f'array{value.dtype.str}{value.shape}'.encode())
+    h.update(np.ascontiguousarray(value).tobytes())
+  elif isinstance(value, (list, tuple)):
+    h.update(f'{type(value).__name__}{len(value)}'.encode())
+    for v in value:
+      _digest(h, v)
+  elif isinstance(value, dict):
+    h.update(f'dict{len(value)}'.encode())
+    for k in sorted(value):
+      _digest(h, k)
+      _digest(h, value[k])
+  else:
+    h.update(repr(value).encode())
+  h.update(b';')
+
+def _settle(value):
+  # data which can only be read once is gathered, so that it can be hashed and still rendered
+  if value is None or isinstance(value, (Chunked, np.ndarray, str, bytes)) or np.isscalar(value):
+    return value
+  if isinstance(value, list) and value and all(isinstance(v, numbers.Real) for v in value):
+    return np.asarray(value, dtype=float)
+  if isinstance(value, (list, tuple)):
+    return type(value)(_settle(v) for v in value)
+  if hasattr(value, '__array__') or isinstance(value, memoryview):
+    return np.asarray(value)
+  if iter(value) is value:
+    return _settle(list(value))
+  return value
+
+class RenderCache():
+  ## directory of rendered wav files, evicting the least recently used beyond a total size
+
+  def __init__(self, directory, maxsize = None):
+    self.directory = directory
+    self.maxsize = _maxsize if maxsize is None else maxsize
+    os.makedirs(directory, exist_ok=True)
+
+  def key(self, encoder, args, kwargs):
+    h = hashlib.sha256()
+    _digest(h, (_version, wv._framerate, f'{encoder.__module__}.{encoder.__qualname__}'))
+    _digest(h, list(args))
+    _digest(h, {k:v for k,v in kwargs.items() if k not in ('filename', 'write')})
+    return h.hexdigest()
+
+  def path(self, key):
+    return os.path.join(self.directory, f'{key}.wav')
+
+  def render(self, encoder, *args, filename = None, **kwargs):
+    # render encoder(*args, **kwargs) into {filename}.wav, unless it has been rendered before
+    # returns the path of the written file
+    args = [_settle(arg) for arg in args]
+    kwargs = {k:_settle(v) for k,v in kwargs.items()}
+    key = self.key(encoder, args, kwargs)
+    if filename is None:
+      filename = encoder.__name__
+    fpath = f'{filename}.wav'
+
+    try:
+      shutil.copyfile(self.path(key), fpath)
+      os.utime(self.path(key)) # mark as recently used
+      return fpath
+    except FileNotFoundError:
+      pass
+
+    # render next to the cache and move into place at once, so no one sees a partial file
+    scratch = os.path.join(self.directory, f'.{key}.{os.getpid()}')
+    try:
+      encoder(*args, filename=scratch, write=True, **kwargs)
+      os.replace(f'{scratch}.wav', self.path(key))
+    finally:
+      if os.path.exists(f'{scratch}.wav'):
+        os.remove(f'{scratch}.wav')
+    shutil.copyfile(self.path(key), fpath)
+    self.evict(keep=key)
+    return fpath
+
+  def evict(self, keep = None):
+    # remove the least recently used renders until the cache fits in maxsize
+    with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+      if fcntl is not None:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+      entries = []
+      for entry in os.scandir(self.directory):
+        if entry.name.endswith('.wav') and not entry.name.startswith('.'):
+          stat = entry.stat()
+          entries.append((stat.st_mtime, stat.st_size, entry.path))
+      total = sum(size for _, size, _ in entries)
+      for _, size, path in sorted(entries):
+        if total <= self.maxsize:
+          break
+        if keep is not None and path == self.path(keep):
+          continue
+        try:
+          os.remove(path)
+        except FileNotFoundError:
+          pass
+        total -= size
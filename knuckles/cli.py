@@ -0,0 +1,137 @@
+import argparse
+import inspect
+import os
+import sys
+
+from . import encryptor
+from . import source
+from . import wavfile
+from .batch import render_batch
+
+## command line
+  ## data files rendered in a batch, with file columns mapped to the data arguments of an encoder,
+  ## every file read in chunks and rendered into a wav file of the same name
+  ##   knuckles bivar_sq data/*.csv --time t --space x --value y --workers 4
+
+_encoders = [name for name, f in inspect.getmembers(encryptor, inspect.isfunction)
+  if f.__module__ == encryptor.__name__ and 'write' in inspect.signature(f).parameters
+  and not name.startswith('_') and name != 'diff']
+
+def _number(text):
+  try:
+    return int(text)
+  except ValueError:
+    return float(text)
+
+def _column(text):
+  # columns are given by position or, in csv files with a header, by name
+  try:
+    return int(text)
+  except ValueError:
+    return text
+
+def _arguments(encoder):
+  # data arguments, which take columns, and keyword arguments of an encoder
+  data, keywords = [], []
+  for p in inspect.signature(getattr(encryptor, encoder)).parameters.values():
+    if p.name in ('filename', 'write'):
+      continue
+    (data if p.default is inspect.Parameter.empty else keywords).append(p)
+  return data, keywords
+
+def _option(parser, p):
+  flag = '--' + p.name.replace('_', '-')
+  if p.name.endswith('_bounds') or p.name.endswith('_range') or p.name == 'bounds':
+    parser.add_argument(flag, dest=p.name, type=_number, nargs=2, metavar=('LOW', 'HIGH'))
+  elif isinstance(p.default, bool):
+    parser.add_argument(flag, dest=p.name, action='store_true')
+  elif isinstance(p.default, str):
+    parser.add_argument(flag, dest=p.name)
+  else:
+    parser.add_argument(flag, dest=p.name, type=_number)
+
+def parser():
+  main = argparse.ArgumentParser(prog='knuckles', description='Render csv or binary data files into sonifications.')
+  encoders = main.add_subparsers(dest='encoder', metavar='encoder', help=', '.join(_encoders))
+  encoders.required = True
+  for encoder in _encoders:
+    data, keywords = _arguments(encoder)
+    sub = encoders.add_parser(encoder, description=inspect.getdoc(getattr(encryptor, encoder)))
+    sub.add_argument('files', nargs='+', help='csv or binary data files, each rendered into its own wav file')
+    columns = sub.add_argument_group('columns', 'columns of every file mapped to the data arguments')
+    for p in data:
+      if p.name.endswith('datasets'):
+        columns.add_argument('--' + p.name.replace('_', '-'), dest=p.name, type=_column, nargs='+', required=True, metavar='COLUMN')
+      else:
+        columns.add_argument('--' + p.name.replace('_', '-'), dest=p.name, type=_column, required=True, metavar='COLUMN')
+    params = sub.add_argument_group('encoder', 'keyword arguments of the encoder, defaults as in the library')
+    for p in keywords:
+      _option(params, p)
+    files = sub.add_argument_group('input and output')
+    files.add_argument('--format', choices=('csv', 'binary'), help='input format, from the extension by default, binary for .bin, .dat and .raw')
+    files.add_argument('--delimiter', default=',', help='csv delimiter')
+    files.add_argument('--no-header', dest='header', action='store_false', help='csv files have no header, columns are positions')
+    files.add_argument('--dtype', default='<f8', help='type of the values in binary files')
+    files.add_argument('--width', type=int, help='values in a row of binary files, the largest column + 1 by default')
+    files.add_argument('--offset', type=int, default=0, help='bytes to skip at the start of binary files')
+    files.add_argument('--chunksize', type=int, help='rows read at a time')
+    files.add_argument('--output-dir', default='.', help='directory for the wav files')
+    files.add_argument('--sampformat', default='int16', choices=tuple(wavfile._formats), help='sample format of the wav files')
+    files.add_argument('--workers', type=int, help='files rendered at once, all cpus by default')
+  return main
+
+def _binary(fpath, fmt):
+  if fmt is not None:
+    return fmt == 'binary'
+  return os.path.splitext(fpath)[1].lower() in ('.bin', '.dat', '.raw')
+
+def read(fpath, columns, fmt = None, delimiter = ',', header = True, dtype = '<f8', width = None, offset = 0, chunksize = None):
+  # chunked values of the given columns of a file, in order
+  if not _binary(fpath, fmt):
+    return [source.read_csv(fpath, c, delimiter=delimiter, header=header, chunksize=chunksize) for c in columns]
+  if not all(isinstance(c, int) for c in columns):
+    raise ValueError('Columns of binary files are given by position.')
+  width = max(columns) + 1 if width is None else width
+  rows = source.read_binary(fpath, dtype=dtype, offset=offset, chunksize=chunksize, columns=width)
+  return [rows.map(lambda chunk, c=c: chunk[:, c]) for c in columns]
+
+def render_file(fpath, encoder, data, reading, sampformat = 'int16', filename = None, write = True, **params):
+  # map the columns of a file with an encoder and render it, run in the worker processes
+  # data : list of (argument, columns), a list of columns for the arguments taking datasets
+  # reading : keyword arguments of read
+  # every column is read at once, so that rows of binary files have the same width for all
+  flat = [c for _, columns in data for c in (columns if isinstance(columns, list) else [columns])]
+  values = iter(read(fpath, flat, **reading))
+  args = [[next(values) for _ in columns] if isinstance(columns, list) else next(values) for _, columns in data]
+  sonif = getattr(encryptor, encoder)(*args, filename=filename, write=False, **params)
+  if write:
+    sonif.render(sampformat=sampformat)
+  return sonif
+
+def main(argv = None):
+  args = parser().parse_args(argv)
+  data, keywords = _arguments(args.encoder)
+  columns = [(p.name, getattr(args, p.name)) for p in data]
+  params = {p.name:tuple(getattr(args, p.name)) if isinstance(getattr(args, p.name), list) else getattr(args, p.name)
+    for p in keywords if getattr(args, p.name) not in (None, False)}
+  reading = {'fmt':args.format, 'delimiter':args.delimiter, 'header':args.header, 'dtype':args.dtype,
+    'width':args.width, 'offset':args.offset, 'chunksize':args.chunksize}
+  os.makedirs(args.output_dir, exist_ok=True)
+  jobs = []
+  for fpath in args.files:
+    filename = os.path.join(args.output_dir, os.path.splitext(os.path.basename(fpath))[0])
+    jobs.append((render_file, (fpath, args.encoder, columns, reading, args.sampformat), params, filename))
+
+  def report(result):
+    fpath = args.files[result['index']]
+    if result['error'] is not None:
+      print(f'{fpath}: failed\n{result["error"]}', file=sys.stderr)
+      return
+    frames = result['metrics']['counters'].get('frames', 0)
+    print(f'{fpath} -> {result["filename"]}: {result["seconds"]:.2f}s, {frames} frames, {frames / result["seconds"]:.0f} frames/s')
+
+  results = render_batch(jobs, workers=args.workers, callback=report)
+  failed = sum(result['error'] is not None for result in results)
+  seconds = sum(result['seconds'] for result in results)
+  print(f'{len(results) - failed} of {len(results)} files rendered in {seconds:.2f}s of work')
+  return 1 if failed else 0
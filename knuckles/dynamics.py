@@ -0,0 +1,65 @@
+import numpy as np
+
+_ceiling = 1 # highest sample let through
+_lookahead = 240 # frames over which the gain falls ahead of a peak, 5ms at 48kHz
+_hold = 2400 # frames the gain is held down after a peak, 50ms at 48kHz
+
+## loudness
+  ## dense renders are brought under the ceiling by a lookahead limiter, which lowers the
+  ## gain smoothly ahead of every peak rather than clipping it, in a single pass over the
+  ## blocks and keeping only a few thousand frames of history
+
+def sliding_min(x, before, after):
+  # min of x[i - before], ..., x[i + after] for every i for which they all exist
+  # as the min of two overlapping windows of a power of two, doubled up to the width
+  width = before + after + 1
+  mins, span = x, 1
+  while 2 * span <= width:
+    mins = np.minimum(mins[:-span], mins[span:])
+    span *= 2
+  return np.minimum(mins[:len(x) - width + 1], mins[width - span:len(x) - span + 1])
+
+def gains(required, lookahead, hold):
+  # smooth gains never above the required ones, for frames lookahead + hold
+  # after the first one and up to lookahead before the last one
+  # every mean is summed over its own window, so gains do not depend on where blocks are cut
+  held = sliding_min(required, hold, lookahead)
+  return np.convolve(held, np.ones(lookahead + 1), 'valid') / (lookahead + 1)
+
+def limit(blocks, ceiling = None, lookahead = None, hold = None):
+  # limit a stream of blocks of shape (frames, channels) to the ceiling, giving back blocks
+  # of the same sizes, which are already in line, as the blocks are read lookahead frames ahead
+  ceiling = _ceiling if ceiling is None else ceiling
+  lookahead = _lookahead if lookahead is None else lookahead
+  hold = _hold if hold is None else hold
+  # the frames waiting to be let out are kept along with the gains they need,
+  # preceded by the history needed to smooth them
+  past = lookahead + hold
+  samples = None
+  required = np.ones(past)
+  sizes = []
+
+  def release(n):
+    # let out the first n frames waiting, given the frames after them are known
+    nonlocal samples, required
+    g = gains(required[:past + n + lookahead], lookahead, hold)
+    out = samples[:n] * g[:n, None]
+    samples = samples[n:]
+    required = required[n:]
+    return np.clip(out, -ceiling, ceiling, out=out)
+
+  for block in blocks:
+    peaks = np.max(np.abs(block), axis=1)
+    need = np.minimum(1, ceiling / np.maximum(peaks, 1e-300))
+    samples = block if samples is None else np.concatenate((samples, block))
+    required = np.concatenate((required, need))
+    sizes.append(len(block))
+    while sizes and len(samples) - sizes[0] >= lookahead:
+      yield release(sizes.pop(0))
+  if samples is None:
+    return
+  # the frames after the last block are silent
+  samples = np.concatenate((samples, np.zeros((lookahead, samples.shape[1]))))
+  required = np.concatenate((required, np.ones(lookahead)))
+  while sizes:
+    yield release(sizes.pop(0))
@@ -1,8 +1,11 @@
 import logging as log
 import math
-from itertools import tee
 
+import numpy as np
+
+from . import metrics as mt
 from . import wave as wv
+from .source import Chunked, aligned, combine
 
 # utility
 _lofrq = 144
@@ -10,12 +13,13 @@ _time_range = (0, 12)
 _balance_range = (-math.tau/8, math.tau/8)
 _frequency_range = (_lofrq, math.pow(2,6)*_lofrq)
 _amplitude_range = (0.54, 0)
+_loudness_range = (1, 0)
 
 def linear_map(x, demesne, codemesne):
   return (x - demesne[0]) * (codemesne[1] - codemesne[0]) / (demesne[1] - demesne[0]) + codemesne[0]
 
 def exp(x, bs = 2):
-  return math.exp(math.log(bs)*x)
+  return np.exp(math.log(bs)*x)
 
 def exponential_map(x, demesne, codemesne, bs = 2):
   a = (codemesne[1] - codemesne[0]) / (exp(demesne[1], bs) - exp(demesne[0], bs))
@@ -29,141 +33,289 @@ def logarithmic_map(x, demesne, codemesne, bs = 10):
 
 def arctan_map(x, gentle = 0.125):
   # map from [-1,1] onto [-1,1], gentle in [0,0.25]
-  return math.atan(x * math.tan(math.tau*gentle)) / (math.tau*gentle)
+  return np.arctan(x * math.tan(math.tau*gentle)) / (math.tau*gentle)
 
 def arctan_midmap(x, demesne, midpoint, codemesne):
   a = (codemesne[1] - codemesne[0]) / 2
-  if x > midpoint:
-    return a*arctan_map((x - midpoint) / (demesne[1] - midpoint))
-  else:
-    return a*arctan_map((x - midpoint) / (midpoint - demesne[0]))
+  above = a*arctan_map((x - midpoint) / (demesne[1] - midpoint))
+  below = a*arctan_map((x - midpoint) / (midpoint - demesne[0]))
+  return np.where(x > midpoint, above, below)
 
 def partition(resolution, demesne):
-  return (linear_map(j/resolution, (0,1), demesne)  for j in range(resolution+1))
+  # resolution+1 evenly spaced points, a single point for resolution 0
+  return linear_map(np.arange(resolution+1) / max(resolution, 1), (0,1), demesne)
+
+def as_array(value):
+  # arrays, series and buffers are viewed as floats without copying, other iterables are gathered
+  # chunked values are left to be streamed
+  if isinstance(value, Chunked):
+    return value
+  if iter(value) is value:
+    return np.fromiter(value, dtype=float)
+  return np.asarray(value, dtype=float)
+
+def apply(function, value, *args):
+  # map an array, or every chunk of chunked values
+  if isinstance(value, Chunked):
+    return value.map(lambda chunk: function(chunk, *args))
+  return function(value, *args)
 
 def find_bounds(iterable):
-  return (min(iterable), max(iterable))
+  if isinstance(iterable, Chunked):
+    return iterable.scan()['bounds']
+  return (np.min(iterable), np.max(iterable))
+
+def is_ordered(value):
+  if isinstance(value, Chunked):
+    return value.scan()['ordered']
+  return bool(np.all(np.diff(value) >= 0))
+
+def voice_bank(kind, **fields):
+  # voices of a kind held in a VoiceBank, or for chunked values a stream of banks, one per chunk
+  chunked = [name for name, value in fields.items() if isinstance(value, Chunked)]
+  if not chunked:
+    # voices run as far as the shortest of the values, manufactured times having one to spare
+    size = min((len(value) for value in fields.values() if np.ndim(value)), default=None)
+    return wv.VoiceBank(kind, **{name:value[:size] if np.ndim(value) else value for name, value in fields.items()})
+  def banks():
+    at = 0
+    for chunks in aligned(*(fields[name] for name in chunked)):
+      # arrays given alongside chunked values are read along with them
+      chunk = {name:value[at:at + len(chunks[0])] if np.ndim(value) else value for name, value in fields.items()}
+      chunk.update(zip(chunked, chunks))
+      at += len(chunks[0])
+      yield from wv.VoiceBank(kind, **chunk)
+  return wv.Waves(banks)
 
 def assign_bounds(arg, bounds):
   if bounds is None:
     bounds = find_bounds(arg)
+  if bounds[0] == bounds[1]:
+    # the maps divide by the width of the bounds
+    raise ValueError(f'Bounds ({float(bounds[0])}, {float(bounds[1])}) are empty, constant values need bounds of their own.')
   return bounds
 
+@mt.timed('mapping')
 def crt_plr(xs, ys):
-  xs = list(xs)
-  ys = list(ys)
+  xs = as_array(xs)
+  ys = as_array(ys)
 
   if len(xs) != len(ys):
     raise IndexError(f'Provided datasets are of differing lengths, which may result in unexpected bahaviour.')
 
-  rs, ts = tee((math.sqrt(x*x + y*y), math.atan2(y,x)) for x,y in zip(xs, ys))
-  return (r[0] for r in rs), (t[1] for t in ts)
+  if isinstance(xs, Chunked) or isinstance(ys, Chunked):
+    return combine(np.hypot, xs, ys), combine(lambda x, y: np.arctan2(y, x), xs, ys)
+  return np.hypot(xs, ys), np.arctan2(ys, xs)
  
+def select(width, time, principal = None):
+  # indices of the points kept, at most the least and the greatest principal value per bin of time
+  bins = np.floor(time / width).astype(np.int64)
+  order = np.lexsort((np.arange(len(time)) if principal is None else principal, bins))
+  edges = np.flatnonzero(np.diff(bins[order])) + 1
+  firsts = order[np.concatenate(([0], edges))] if len(order) else order
+  lasts = order[np.concatenate((edges - 1, [len(order) - 1]))] if len(order) else order
+  return np.unique(np.concatenate((firsts, lasts)))
+
+def chunked_select(width, sources, principal = None):
+  # indices of the points select keeps out of chunked sources, time being the first of them,
+  # gathering the least and greatest point of every bin as (value, index) over the chunks
+  least, greatest = {}, {}
+  at = 0
+  for chunks in aligned(*sources):
+    time = chunks[0]
+    values = np.arange(at, at + len(time)) if principal is None else chunks[principal]
+    bins = np.floor(time / width).astype(np.int64)
+    for i in select(width, time, None if principal is None else values):
+      point = (values[i], at + i)
+      # ties go to the earliest point for the least and the latest for the greatest, as in select
+      if bins[i] not in least or point[0] < least[bins[i]][0]:
+        least[bins[i]] = point
+      if bins[i] not in greatest or point[0] >= greatest[bins[i]][0]:
+        greatest[bins[i]] = point
+    at += len(time)
+  return np.unique([index for _, index in list(least.values()) + list(greatest.values())]).astype(np.int64)
+
+def decimate(budget, time, *values, duration = 0.7):
+  # thin out points so that at most budget voices of duration seconds sound at once
+  # time is cut into bins holding the least and the greatest of the first values, or the
+  # first and last points without values, so the outline of the data is kept
+  # returns the processed time and values, keeping only the selected points
+  if budget is None:
+    return (time,) + values
+  if budget < 4:
+    raise ValueError('A budget of at least 4 voices is needed to keep the least and greatest point of a bin.')
+  # the voices mixed into a block are those starting within duration before it or during it,
+  # a span overlapping budget // 2 bins at most, each keeping two, for blocks as long as
+  # they are at the lowest rate, so that the budget holds whatever rate the render is made at
+  width = (duration + wv._blocksize / wv._minframerate) / (budget // 2 - 1)
+  fields = (time,) + values
+  principal = 1 if values else None
+  if not any(isinstance(field['value'], Chunked) for field in fields):
+    if time['size'] <= budget:
+      return fields
+    keep = select(width, time['value'], None if principal is None else values[0]['value'])
+    return tuple(dict(field, value=field['value'][keep], size=len(keep)) for field in fields)
+
+  sources = [field['value'] if isinstance(field['value'], Chunked) else Chunked(lambda v=field['value']: iter([v])) for field in fields]
+  if not time['ordered']:
+    # a bin of unordered times may be spread over every chunk, so the points kept in each
+    # are found in a first pass, holding only the least and greatest point of every bin
+    keep = np.sort(chunked_select(width, sources, principal))
+    def kept(i):
+      at = 0
+      for chunks in aligned(*sources):
+        yield chunks[i][np.isin(np.arange(at, at + len(chunks[0])), keep)]
+        at += len(chunks[0])
+    selected = [Chunked(lambda i=i: kept(i)) for i in range(len(fields))]
+    return tuple(dict(field, value=value, size=len(value)) for field, value in zip(fields, selected))
+
+  # ordered points are thinned chunk by chunk, the last bin of a chunk waiting for the next
+  # so that every bin is thinned as a whole
+  def thinned(i):
+    held = None
+    for chunks in aligned(*sources):
+      if held is not None:
+        chunks = tuple(np.concatenate(pair) for pair in zip(held, chunks))
+      bins = np.floor(chunks[0] / width)
+      last = bins == bins[-1]
+      held = tuple(chunk[last] for chunk in chunks)
+      chunks = tuple(chunk[~last] for chunk in chunks)
+      yield chunks[i][select(width, chunks[0], None if principal is None else chunks[principal])]
+    if held is not None:
+      yield held[i][select(width, held[0], None if principal is None else held[principal])]
+  selected = [Chunked(lambda i=i: thinned(i)) for i in range(len(fields))]
+  return tuple(dict(field, value=value, size=len(value)) for field, value in zip(fields, selected))
+
+def share(budget, parts):
+  # budget of each of several parts sounding together, adding up to no more than the budget
+  if budget is None:
+    return None
+  if budget < 4 * parts:
+    raise ValueError(f'A budget of at least {4 * parts} voices is needed to share it between {parts} parts.')
+  return budget // parts
+
 def test_len(*args):
   if len({arg['size'] for arg in args}) > 1:
     raise IndexError(f'Provided datasets are of differing lengths, which may result in unexpected bahaviour.')
 
 # processing
+@mt.timed('mapping')
 def process_data(value):
-  value = list(value)
-  return {'value':(v for v in value), 'size':len(value)}
+  value = as_array(value)
+  return {'value':value, 'size':len(value)}
 
+@mt.timed('mapping')
 def process_amplitude(value, bounds = None):
-  value = list(value) # for safety
+  value = as_array(value)
   demesne = assign_bounds(value, bounds)
   codemesne = _amplitude_range
-  return {'value':(logarithmic_map(v, demesne, codemesne) for v in value), 'size':len(value)}
+  return {'value':apply(logarithmic_map, value, demesne, codemesne), 'size':len(value)}
 
+@mt.timed('mapping')
+def process_loudness(value, bounds = None):
+  # relative loudness, scaling a given amplitude
+  value = as_array(value)
+  demesne = assign_bounds(value, bounds)
+  codemesne = _loudness_range
+  return {'value':apply(logarithmic_map, value, demesne, codemesne), 'size':len(value)}
+
+@mt.timed('mapping')
 def process_frequency(value, bounds = None):
-  value = list(value) # for safety
+  value = as_array(value)
   demesne = assign_bounds(value, bounds)
   codemesne = _frequency_range
-  return {'value':(exponential_map(v, demesne, codemesne) for v in value), 'size':len(value)}
+  return {'value':apply(exponential_map, value, demesne, codemesne), 'size':len(value)}
 
+@mt.timed('mapping')
 def process_balance(value, bounds = None):
-  value = list(value) # for safety
-  demesne = assign_bounds(value, bounds = None)
-  codemesne = _balance_range
-  return {'value':(-linear_map(v, demesne, codemesne) for v in value), 'size':len(value)}
+  value = as_array(value)
+  demesne = assign_bounds(value, bounds)
+  codemesne = (-_balance_range[0], -_balance_range[1]) # balance runs against the values
+  return {'value':apply(linear_map, value, demesne, codemesne), 'size':len(value)}
 
+@mt.timed('mapping')
 def process_balance_space(value, bounds = None, midpoint = None):
-  value = list(value) # for safety
-  demesne = assign_bounds(value, bounds = None)
+  value = as_array(value)
+  demesne = assign_bounds(value, bounds)
   if midpoint is None:
     midpoint = (demesne[0] + demesne[1])/2
-  codemesne = _balance_range
-  return {'value':(-arctan_midmap(v, demesne, midpoint, codemesne) for v in value), 'size':len(value)}
+  codemesne = (-_balance_range[0], -_balance_range[1]) # balance runs against the values
+  return {'value':apply(arctan_midmap, value, demesne, midpoint, codemesne), 'size':len(value)}
 
+@mt.timed('mapping')
 def process_time(value, bounds = None):
-  value = list(value) # for safety
+  value = as_array(value)
   demesne = assign_bounds(value, bounds)
   codemesne = _time_range
-  return {'value':(linear_map(v, demesne, codemesne) for v in value), 'size':len(value), 'endpoint':codemesne[1]+1}
+  return {'value':apply(linear_map, value, demesne, codemesne), 'size':len(value), 'endpoint':codemesne[1]+1, 'ordered':is_ordered(value) and demesne[0] <= demesne[1]}
 
+@mt.timed('mapping')
 def manufacture_time(size, step = 0.5):
-  return {'value':partition(size, (0, size*step)), 'size':size, 'endpoint':(size+1)*step}
+  return {'value':partition(size, (0, size*step)), 'size':size, 'endpoint':(size+1)*step, 'ordered':True}
 
 # additive synthesis
 ## nulvar
 
-def nulvar_sq_time(value, value_bounds = None, frequency = 432, balance = 0, shape = 'sine', filename = 'nulvar_sq_time', write = True):
+def nulvar_sq_time(value, value_bounds = None, frequency = 432, balance = 0, shape = 'sine', filename = 'nulvar_sq_time', write = True, envelope = 'bump', budget = None):
   # maps the values onto time panning everything in the middle, with constant frequency
-  time = process_time(value, value_bounds)
+  # budget : most voices sounding at once, see decimate
+  time, = decimate(budget, process_time(value, value_bounds))
   
-  waves = (wv.Plop(offset=t, frequency=frequency, balance=balance, shape=shape) for t in time['value'])
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, offset=time['value'], frequency=frequency, balance=balance, shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def nulvar_sq_freq(value, value_bounds = None, balance = 0, shape = 'sine', filename = 'nulvar_sq_freq', write = True):
+def nulvar_sq_freq(value, value_bounds = None, balance = 0, shape = 'sine', filename = 'nulvar_sq_freq', write = True, envelope = 'bump'):
   # maps the values onto frequency panning everything in the middle, spaces evenly in time
   frequency = process_frequency(value, value_bounds)
   time = manufacture_time(frequency['size'])
   
-  waves = (wv.Plop(frequency=f, offset=t, balance=balance, shape=shape) for f,t in zip(frequency['value'], time['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, frequency=frequency['value'], offset=time['value'], balance=balance, shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def nulvar_sq_blnc(value, value_bounds = None, frequency = 432, shape = 'sine', filename = 'nulvar_sq_blnc', write = True):
+def nulvar_sq_blnc(value, value_bounds = None, frequency = 432, shape = 'sine', filename = 'nulvar_sq_blnc', write = True, envelope = 'bump'):
   # maps the values onto balance with constant frequency, spaces evenly in time
   balance = process_balance(value, value_bounds)
   time = manufacture_time(balance['size'])
   
-  waves = (wv.Plop(balance=b, offset=t, frequency=frequency, shape=shape) for b,t in zip(balance['value'], time['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, balance=balance['value'], offset=time['value'], frequency=frequency, shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def nulvar_ns(value, value_bounds = None, duration = 3, amplitude = 0.02, balance=0, shape = 'sine', filename = 'nulvar_ns', write = True):
+def nulvar_ns(value, value_bounds = None, duration = 3, amplitude = 0.02, balance=0, shape = 'sine', filename = 'nulvar_ns', write = True, spectral = False):
   # maps the arguments onto frequency panning everything in the middle, playing them at the same time
   frequency = process_frequency(value, value_bounds)
 
-  waves = (wv.Wave(frequency=f, balance=balance, shape=shape, amplitude=amplitude) for f in frequency['value'])
-  sonif = wv.Sonification(waves, duration, filename)
+  waves = voice_bank(wv.Wave, frequency=frequency['value'], balance=balance, shape=shape, amplitude=amplitude)
+  sonif = wv.Sonification(waves, duration, filename, spectral, ordered=True)
   if write:
     sonif.render()
   return sonif
 
 ## univar
 
-def univar_sq_time_freq(time, value, time_bounds = None, value_bounds = None, balance = 0, shape = 'sine', filename = 'univar_sq_freq', write = True):
+def univar_sq_time_freq(time, value, time_bounds = None, value_bounds = None, balance = 0, shape = 'sine', filename = 'univar_sq_freq', write = True, envelope = 'bump', budget = None):
   # maps the arguments onto time and values onto frequency panning everything in the middle
   time = process_time(time, time_bounds)
   frequency = process_frequency(value, value_bounds)
   
   test_len(time, frequency)
+  time, frequency = decimate(budget, time, frequency)
   
-  waves = (wv.Plop(frequency=f, offset=t, balance=balance, shape=shape) for f,t in zip(frequency['value'], time['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, frequency=frequency['value'], offset=time['value'], balance=balance, shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def univar_sq_blnc_freq(space, value, space_bounds = None, value_bounds = None, shape = 'sine', filename = 'univar_sq_blnc', write = True):
+def univar_sq_blnc_freq(space, value, space_bounds = None, value_bounds = None, shape = 'sine', filename = 'univar_sq_blnc', write = True, envelope = 'bump'):
   # maps the arguments onto balance and values onto frequency, spacing values equally in time
 
   balance = process_balance(space, space_bounds)
@@ -173,27 +325,28 @@ def univar_sq_blnc_freq(space, value, space_bounds = None, value_bounds = None,
   
   time = manufacture_time(balance['size'])
 
-  waves = (wv.Plop(frequency=f, balance=b, offset=t, shape=shape) for f,b,t in zip(frequency['value'], balance['value'], time['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, frequency=frequency['value'], balance=balance['value'], offset=time['value'], shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def univar_sq_time_blnc(time, space, time_bounds = None, space_bounds = None, frequency = 432, shape = 'sine', filename = 'univar_sq_blnc', write = True):
+def univar_sq_time_blnc(time, space, time_bounds = None, space_bounds = None, frequency = 432, shape = 'sine', filename = 'univar_sq_blnc', write = True, envelope = 'bump', budget = None):
   # maps the arguments onto time and values onto balance
   
   time = process_time(time, time_bounds)
   balance = process_balance(space, space_bounds)
 
   test_len(time, balance)
+  time, balance = decimate(budget, time, balance)
   
-  waves = (wv.Plop(balance=b, offset=t, frequency=frequency, shape=shape) for b,t in zip(balance['value'], time['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, balance=balance['value'], offset=time['value'], frequency=frequency, shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def univar_ns(space, value, space_bounds = None, value_bounds = None, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'univar_ns', write = True):
+def univar_ns(space, value, space_bounds = None, value_bounds = None, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'univar_ns', write = True, spectral = False):
   # maps the arguments onto frequency and balance, playing them at the same time
 
   balance = process_balance(space, space_bounds)
@@ -201,13 +354,13 @@ def univar_ns(space, value, space_bounds = None, value_bounds = None, duration =
 
   test_len(balance, frequency)
 
-  waves = (wv.Wave(frequency=f, balance=b, shape=shape, amplitude=amplitude) for f,b in zip(frequency['value'],balance['value']))
-  sonif = wv.Sonification(waves, duration, filename)
+  waves = voice_bank(wv.Wave, frequency=frequency['value'], balance=balance['value'], shape=shape, amplitude=amplitude)
+  sonif = wv.Sonification(waves, duration, filename, spectral, ordered=True)
   if write:
     sonif.render()
   return sonif
 
-def univar_space_ns(xarg, yarg, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'univar_space_ns', write = True):
+def univar_space_ns(xarg, yarg, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'univar_space_ns', write = True, spectral = False):
   # project R^2 onto a circle, unwind with frequency, preserve distance with loudness
   ampli, frequency = crt_plr(xarg, yarg)
   ampli = process_loudness(ampli)
@@ -215,13 +368,13 @@ def univar_space_ns(xarg, yarg, duration = 3, amplitude = 0.02, shape = 'sine',
 
   test_len(ampli, frequency)
 
-  waves = (wv.Wave(frequency=f, shape=shape, amplitude=amplitude*a) for f,a in zip(frequency['value'], ampli['value']))
-  sonif = wv.Sonification(waves, duration, filename)
+  waves = voice_bank(wv.Wave, frequency=frequency['value'], shape=shape, amplitude=apply(np.multiply, ampli['value'], amplitude))
+  sonif = wv.Sonification(waves, duration, filename, spectral, ordered=True)
   if write:
     sonif.render()
   return sonif
 
-def univar_space_ns_blnc(xarg, yarg, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'univar_space_ns_blnc', write = True):
+def univar_space_ns_blnc(xarg, yarg, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'univar_space_ns_blnc', write = True, spectral = False):
   # project R^2 onto a circle, unwind with frequency, preserve distance with balance
   balance, frequency = crt_plr(xarg, yarg)
   balance = process_balance_space(balance)
@@ -229,15 +382,15 @@ def univar_space_ns_blnc(xarg, yarg, duration = 3, amplitude = 0.02, shape = 'si
 
   test_len(balance, frequency)
 
-  waves = (wv.Wave(frequency=f, balance=b, shape=shape, amplitude=amplitude) for f,b in zip(frequency['value'], balance['value']))
-  sonif = wv.Sonification(waves, duration, filename)
+  waves = voice_bank(wv.Wave, frequency=frequency['value'], balance=balance['value'], shape=shape, amplitude=amplitude)
+  sonif = wv.Sonification(waves, duration, filename, spectral, ordered=True)
   if write:
     sonif.render()
   return sonif
 
 ## bivar
 
-def bivar_sq(time, space, value, time_bounds = None, space_bounds = None, value_bounds = None, shape = 'sine', filename = 'bivar_sq', write = True):
+def bivar_sq(time, space, value, time_bounds = None, space_bounds = None, value_bounds = None, shape = 'sine', filename = 'bivar_sq', write = True, envelope = 'bump', budget = None):
   # maps the arguments onto time and balance, map values onto frequency
 
   time = process_time(time, time_bounds)
@@ -245,45 +398,47 @@ def bivar_sq(time, space, value, time_bounds = None, space_bounds = None, value_
   frequency = process_frequency(value, value_bounds)
 
   test_len(time, balance, frequency)
+  time, frequency, balance = decimate(budget, time, frequency, balance)
   
-  waves = (wv.Plop(frequency=f, balance=b, offset=t, shape=shape) for f,b,t in zip(frequency['value'], balance['value'], time['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, frequency=frequency['value'], balance=balance['value'], offset=time['value'], shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def bivar_space_sq_freq(xarg, yarg, value, value_bounds = None, shape = 'sine', filename = 'bivar_space_sq_freq', write = True):
+def bivar_space_sq_freq(xarg, yarg, value, value_bounds = None, shape = 'sine', filename = 'bivar_space_sq_freq', write = True, envelope = 'bump'):
   # project R^2 onto a circle, unwind with balance, preserve distance with loudness, space evenly in time
   ampli, balance = crt_plr(xarg, yarg)
   ampli = process_amplitude(ampli)
-  balace = process_balance(balance, (-math.tau/2, math.tau/2))
+  balance = process_balance(balance, (-math.tau/2, math.tau/2))
   frequency = process_frequency(value, value_bounds)
 
   test_len(ampli, balance, frequency)
 
   time = manufacture_time(ampli['size'])
-  waves = (wv.Plop(frequency=f, balance=b, offset=t, apmlitude=a, shape=shape) for f,b,t,a in zip(frequency['value'], balance['value'], time['value'], ampli['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, frequency=frequency['value'], balance=balance['value'], offset=time['value'], amplitude=ampli['value'], shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def bivar_space_sq_time(xarg, yarg, time, time_bounds = None, shape = 'sine', filename = 'bivar_space_sq_time', write = True):
+def bivar_space_sq_time(xarg, yarg, time, time_bounds = None, shape = 'sine', filename = 'bivar_space_sq_time', write = True, envelope = 'bump', budget = None):
   # project R^2 onto a circle, unwind with balance, preserve distance with loudness
   ampli, balance = crt_plr(xarg, yarg)
   ampli = process_amplitude(ampli)
-  balace = process_balance(balance, (-math.tau/2, math.tau/2))
+  balance = process_balance(balance, (-math.tau/2, math.tau/2))
   time = process_time(time, time_bounds)
 
   test_len(ampli, balance, time)
+  time, ampli, balance = decimate(budget, time, ampli, balance)
 
-  waves = (wv.Plop(balance=b, offset=t, apmlitude=a, shape=shape) for b,t,a in zip(balance['value'], time['value'], ampli['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, balance=balance['value'], offset=time['value'], amplitude=ampli['value'], shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
 
-def bivar_space_ns(xarg, yarg, space, space_bounds = None, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'bivar_space_ns', write = True):
+def bivar_space_ns(xarg, yarg, space, space_bounds = None, duration = 3, amplitude = 0.02, shape = 'sine', filename = 'bivar_space_ns', write = True, spectral = False):
   # project R^2 onto a circle, unwind with frequency, preserve distance with loudnes, map third argument onto balance
   ampli, frequency = crt_plr(xarg, yarg)
   ampli = process_loudness(ampli)
@@ -292,15 +447,15 @@ def bivar_space_ns(xarg, yarg, space, space_bounds = None, duration = 3, amplitu
   
   test_len(ampli, balance, frequency)
 
-  waves = (wv.Wave(frequency=f, balance=b, shape=shape, amplitude=amplitude*a) for f,b,a in zip(frequency['value'], balance['value'], ampli['value']))
-  sonif = wv.Sonification(waves, duration, filename)
+  waves = voice_bank(wv.Wave, frequency=frequency['value'], balance=balance['value'], shape=shape, amplitude=apply(np.multiply, ampli['value'], amplitude))
+  sonif = wv.Sonification(waves, duration, filename, spectral, ordered=True)
   if write:
     sonif.render()
   return sonif
 
 ## trivar
 
-def trivar_space_sq(xarg, yarg, time, value, time_bounds = None, value_bounds = None, shape = 'sine', filename = 'trivar_space_sq', write = True):
+def trivar_space_sq(xarg, yarg, time, value, time_bounds = None, value_bounds = None, shape = 'sine', filename = 'trivar_space_sq', write = True, envelope = 'bump', budget = None):
   # project R^2 onto a circle, unwind with balance, preserve distance with loudness, map third argument onto time
   ampli, balance = crt_plr(xarg, yarg)
   ampli = process_amplitude(ampli)
@@ -309,9 +464,10 @@ def trivar_space_sq(xarg, yarg, time, value, time_bounds = None, value_bounds =
   frequency = process_frequency(value, value_bounds)
 
   test_len(ampli, balance, time, frequency)
+  time, frequency, ampli, balance = decimate(budget, time, frequency, ampli, balance)
 
-  waves = (wv.Plop(frequency=f, balance=b, offset=t, amplitude=a, shape=shape) for f,b,t,a in zip(frequency['value'], balance['value'], time['value'], ampli['value']))
-  sonif = wv.Sonification(waves, time['endpoint'], filename)
+  waves = voice_bank(wv.Plop, frequency=frequency['value'], balance=balance['value'], offset=time['value'], amplitude=ampli['value'], shape=shape, envelope=envelope)
+  sonif = wv.Sonification(waves, time['endpoint'], filename, ordered=time['ordered'])
   if write:
     sonif.render()
   return sonif
@@ -319,75 +475,75 @@ def trivar_space_sq(xarg, yarg, time, value, time_bounds = None, value_bounds =
 # compare datasets
 ## nulvar
 
-def cmp_freq_nulvar_sq_time(datasets, bounds = None, shape = 'sine', frequency_range = _frequency_range, filename = 'cmp_freq_nulvar_sq_time', write = True):
+def cmp_freq_nulvar_sq_time(datasets, bounds = None, shape = 'sine', frequency_range = _frequency_range, filename = 'cmp_freq_nulvar_sq_time', write = True, envelope = 'bump', budget = None):
   # compare by frequency
   datasets = [process_data(data) for data in datasets]
   test_len(*datasets)
   frequency = list(partition(len(datasets)-1, frequency_range))
   
-  sonif = wv.soni_sum(nulvar_sq_time(data['value'], bounds, frequency=f, shape=shape, write=False) for data,f in zip(datasets,frequency))
+  sonif = wv.soni_sum(nulvar_sq_time(data['value'], bounds, frequency=f, shape=shape, write=False, envelope=envelope, budget=share(budget, len(datasets))) for data,f in zip(datasets,frequency))
   sonif.filename = filename
   if write:
     sonif.render()
   return sonif
 
-def cmp_blnc_nulvar_sq_time(datasets, bounds = None, shape = 'sine', balance_range = _balance_range, filename = 'cmp_blnc_nulvar_sq_time', write = True):
+def cmp_blnc_nulvar_sq_time(datasets, bounds = None, shape = 'sine', balance_range = _balance_range, filename = 'cmp_blnc_nulvar_sq_time', write = True, envelope = 'bump', budget = None):
   # compare by balance
   datasets = [process_data(data) for data in datasets]
   test_len(*datasets)
   balance = list(partition(len(datasets)-1, balance_range))
   log.debug(balance)
 
-  sonif = wv.soni_sum(nulvar_sq_time(data['value'], bounds, balance=b, shape=shape, write=False) for data,b in zip(datasets,balance))
+  sonif = wv.soni_sum(nulvar_sq_time(data['value'], bounds, balance=b, shape=shape, write=False, envelope=envelope, budget=share(budget, len(datasets))) for data,b in zip(datasets,balance))
   sonif.filename = filename
   if write:
     sonif.render()
   return sonif
 
-def cmp_freqblnc_nulvar_sq_time(datasets, bounds = None, shape = 'sine', balance_range = _balance_range, frequency_range = _frequency_range, filename = 'cmp_freqblnc_nulvar_sq_time', write = True):
+def cmp_freqblnc_nulvar_sq_time(datasets, bounds = None, shape = 'sine', balance_range = _balance_range, frequency_range = _frequency_range, filename = 'cmp_freqblnc_nulvar_sq_time', write = True, envelope = 'bump', budget = None):
   # compare by balance and frequency
   datasets = [process_data(data) for data in datasets]
   test_len(*datasets)
   balance = list(partition(len(datasets)-1, balance_range))
   frequency = list(partition(len(datasets)-1, frequency_range))
   
-  sonif = wv.soni_sum(nulvar_sq_time(data['value'], bounds, frequency=f, balance=b, shape=shape, write=False) for data,f,b in zip(datasets,frequency,balance))
+  sonif = wv.soni_sum(nulvar_sq_time(data['value'], bounds, frequency=f, balance=b, shape=shape, write=False, envelope=envelope, budget=share(budget, len(datasets))) for data,f,b in zip(datasets,frequency,balance))
   sonif.filename = filename
   if write:
     sonif.render()
   return sonif
 
-def cmp_nulvar_sq_freq(datasets, bounds = None, shape = 'sine', balance_range = _balance_range, filename = 'cmp_nulvar_sq_freq', write = True):
+def cmp_nulvar_sq_freq(datasets, bounds = None, shape = 'sine', balance_range = _balance_range, filename = 'cmp_nulvar_sq_freq', write = True, envelope = 'bump'):
   # compare by balance
   datasets = [process_data(data) for data in datasets]
   test_len(*datasets)
   balance = list(partition(len(datasets)-1, balance_range))
   
-  sonif = wv.soni_sum(nulvar_sq_freq(data['value'], bounds, balance=b, shape=shape, write=False) for data,b in zip(datasets,balance))
+  sonif = wv.soni_sum(nulvar_sq_freq(data['value'], bounds, balance=b, shape=shape, write=False, envelope=envelope) for data,b in zip(datasets,balance))
   sonif.filename = filename
   if write:
     sonif.render()
   return sonif
 
-def cmp_nulvar_sq_blnc(datasets, bounds = None, shape = 'sine', frequency_range = _frequency_range, filename = 'cmp_nulvar_sq_blnc', write = True):
+def cmp_nulvar_sq_blnc(datasets, bounds = None, shape = 'sine', frequency_range = _frequency_range, filename = 'cmp_nulvar_sq_blnc', write = True, envelope = 'bump'):
   # compare by frequency
   datasets = [process_data(data) for data in datasets]
   test_len(*datasets)
   frequency = list(partition(len(datasets)-1, frequency_range))
   
-  sonif = wv.soni_sum(nulvar_sq_blnc(data['value'], bounds, frequency=f, shape=shape, write=False) for data,f in zip(datasets,frequency))
+  sonif = wv.soni_sum(nulvar_sq_blnc(data['value'], bounds, frequency=f, shape=shape, write=False, envelope=envelope) for data,f in zip(datasets,frequency))
   sonif.filename = filename
   if write:
     sonif.render()
   return sonif
 
-def cmp_nulvar_ns(datasets, bounds = None, duration = 3, amplitude = 0.02, balance_range = _balance_range, filename = 'cmp_nulvar_ns', write = True):
+def cmp_nulvar_ns(datasets, bounds = None, duration = 3, amplitude = 0.02, balance_range = _balance_range, filename = 'cmp_nulvar_ns', write = True, spectral = False):
   # compare by balance
   datasets = [process_data(data) for data in datasets]
   test_len(*datasets)
   balance = list(partition(len(datasets)-1, balance_range))
   
-  sonif = wv.soni_sum(nulvar_ns(data['value'], bounds, balance=b, duration=duration, amplitude=amplitude, write=False) for data,b in zip(datasets,balance))
+  sonif = wv.soni_sum(nulvar_ns(data['value'], bounds, balance=b, duration=duration, amplitude=amplitude, write=False, spectral=spectral) for data,b in zip(datasets,balance))
   sonif.filename = filename
   if write:
     sonif.render()
@@ -395,7 +551,7 @@ def cmp_nulvar_ns(datasets, bounds = None, duration = 3, amplitude = 0.02, balan
 
 ## univar
 
-def cmp_univar_sq_freq(time_datasets, value_datasets, time_bounds = None, value_bounds = None, shape = 'sine', balance_range = _balance_range, filename = 'cmp_univar_sq_freq', write = True):
+def cmp_univar_sq_freq(time_datasets, value_datasets, time_bounds = None, value_bounds = None, shape = 'sine', balance_range = _balance_range, filename = 'cmp_univar_sq_freq', write = True, envelope = 'bump', budget = None):
   # compare by balance
   time = [process_data(data) for data in time_datasets]
   frequency = [process_data(data) for data in value_datasets]
@@ -403,13 +559,13 @@ def cmp_univar_sq_freq(time_datasets, value_datasets, time_bounds = None, value_
   test_len(*frequency)
   balance = list(partition(len(time)-1, balance_range))
   
-  sonif = wv.soni_sum(univar_sq_time_freq(t['value'], f['value'], time_bounds, value_bounds, balance=b, shape=shape, write=False) for t,f,b in zip(time, frequency, balance))
+  sonif = wv.soni_sum(univar_sq_time_freq(t['value'], f['value'], time_bounds, value_bounds, balance=b, shape=shape, write=False, envelope=envelope, budget=share(budget, len(time))) for t,f,b in zip(time, frequency, balance))
   sonif.filename = filename
   if write:
     sonif.render()
   return sonif
 
-def cmp_univar_sq_blnc(time_datasets, space_datasets, time_bounds = None, space_bounds = None, shape = 'sine', frequency_range = _frequency_range, filename = 'cmp_univar_sq_blnc', write = True):
+def cmp_univar_sq_blnc(time_datasets, space_datasets, time_bounds = None, space_bounds = None, shape = 'sine', frequency_range = _frequency_range, filename = 'cmp_univar_sq_blnc', write = True, envelope = 'bump', budget = None):
   # compare by frequency
   time = [process_data(data) for data in time_datasets]
   balance = [process_data(data) for data in space_datasets]
@@ -417,7 +573,7 @@ def cmp_univar_sq_blnc(time_datasets, space_datasets, time_bounds = None, space_
   test_len(*balance)
   frequency = list(partition(len(time)-1, frequency_range))
   
-  sonif = wv.soni_sum(univar_sq_time_blnc(t['value'], b['value'], time_bounds, value_bounds, frequency=f, shape=shape, write=False) for t,b,f in zip(time, balance, frequency))
+  sonif = wv.soni_sum(univar_sq_time_blnc(t['value'], b['value'], time_bounds, space_bounds, frequency=f, shape=shape, write=False, envelope=envelope, budget=share(budget, len(time))) for t,b,f in zip(time, balance, frequency))
   sonif.filename = filename
   if write:
     sonif.render()
@@ -427,8 +583,8 @@ def cmp_univar_sq_blnc(time_datasets, space_datasets, time_bounds = None, space_
 
 def diff(sonif1, sonif2, filename = 'diff', write = True):
   # take two wave sequences, flip the phase of one and add them together
-  sonif2.flip_phase()
-  sonif = sonif1 + sonif2
+  sonif = sonif1 + sonif2.scaled(-1)
+  sonif.filename = filename
   if write:
     sonif.render()
   return sonif
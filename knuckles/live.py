@@ -0,0 +1,101 @@
+import inspect
+import math
+from collections import deque
+
+from . import encryptor
+from . import wave as wv
+from .wavfile import WavWriter
+
+## live sonification
+  ## points arriving over time are mapped with bounds fixed upfront and rendered into
+  ## an open output as they come, the part already written is never touched again
+  ## a new point may still start a voice at the offset of the latest one, so the render
+  ## runs up to the block holding that offset, and through the tails of the voices on close
+
+class _Queue():
+  ## voices waiting to be rendered, an iterator which runs dry until more are added
+
+  def __init__(self):
+    self.voices = deque()
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    if not self.voices:
+      raise StopIteration
+    return self.voices.popleft()
+
+class LiveSonification():
+  ## a sequential encoder fed batch by batch, rendered incrementally into a wav file or stream
+
+  def __init__(self, encoder, output = None, sampformat = 'int16', framerate = None, mono = False, **params):
+    # encoder : function, or name of one in encryptor, mapping time from the data
+    # output : path of the wav file without extension, or a binary file object, the encoder name by default
+    # params : keyword arguments of the encoder, among which every one of its bounds,
+    #   so that points map the same way in every batch, times beyond the bounds extend the timeline
+    if isinstance(encoder, str):
+      encoder = getattr(encryptor, encoder)
+    missing = [name for name in inspect.signature(encoder).parameters if name.endswith('_bounds') and params.get(name) is None]
+    if missing:
+      raise ValueError(f'Live sonifications need fixed bounds, provide {", ".join(missing)}.')
+    self.encoder = encoder
+    self.params = params
+    self.framerate = wv._framerate if framerate is None else framerate
+    self.nchannels = 1 if mono else 2
+
+    if output is None:
+      output = encoder.__name__
+    self._owned = isinstance(output, str)
+    self.f = open(f'{output}.wav', 'wb') if self._owned else output
+    self.writer = WavWriter(self.f, nchannels=self.nchannels, framerate=self.framerate, sampformat=sampformat)
+    self.queue = _Queue()
+    self.blocks = wv.compute_blocks(self.queue, ordered=True, nchannels=self.nchannels)
+    self.rendered = 0 # frames written so far
+    self.frontier = 0 # offset of the latest voice, before which nothing can change
+    self.end = 0 # first frame after every voice so far
+
+  def append(self, *data):
+    # map a batch of points, which come no earlier than those before, and render what is final
+    # returns the number of frames written
+    voices = list(self.encoder(*data, write=False, **self.params).voices(self.framerate))
+    if not voices:
+      return 0
+    if voices[0].offset < self.frontier:
+      raise ValueError('Points of a live sonification should come in order of time.')
+    self.queue.voices.extend(voices)
+    self.frontier = voices[-1].offset
+    self.end = max([self.end] + [math.inf if w.end is None else w.end for w in voices])
+    return self.advance(self.frontier - self.frontier % wv._blocksize)
+
+  def advance(self, until):
+    # render whole blocks up to frame until
+    written = 0
+    while self.rendered + wv._blocksize <= until:
+      block = next(self.blocks)
+      self.writer.write(block)
+      self.rendered += len(block)
+      written += len(block)
+    self.writer.flush()
+    self.f.flush()
+    return written
+
+  def close(self, duration = None):
+    # render the rest, up to duration in seconds or until every voice has ended, and finish the file
+    stop = self.end if duration is None else int(duration * self.framerate)
+    if stop == math.inf:
+      raise ValueError('Never ending voices need a duration to close on.')
+    while self.rendered < stop:
+      block = next(self.blocks)[:stop - self.rendered]
+      self.writer.write(block)
+      self.rendered += len(block)
+    self.blocks.close()
+    self.writer.close()
+    if self._owned:
+      self.f.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
@@ -0,0 +1,99 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+## render instrumentation
+  ## while a recording is open, the stages of a render report how long they took
+  ## and how much they did, otherwise every probe is a single check for None
+  ## the recording is held per context, so renders on other threads or tasks are not mixed
+  ## into it, and renders which run later, such as generators, take it when they are made
+
+_current = ContextVar('metrics', default=None) # metrics being recorded, if any
+
+class Metrics():
+  ## stage timings in seconds and counters of everything recorded so far
+
+  def __init__(self):
+    self.timings = {}
+    self.counters = {}
+
+  def time(self, stage, seconds):
+    self.timings[stage] = self.timings.get(stage, 0) + seconds
+
+  def count(self, counter, n = 1):
+    self.counters[counter] = self.counters.get(counter, 0) + n
+
+  def peak(self, counter, value):
+    self.counters[counter] = max(self.counters.get(counter, 0), value)
+
+  @contextmanager
+  def stage(self, stage):
+    start = time.perf_counter()
+    try:
+      yield self
+    finally:
+      self.time(stage, time.perf_counter() - start)
+
+  def merge(self, other):
+    # gather metrics recorded elsewhere, such as in worker processes
+    for stage, seconds in other.timings.items():
+      self.time(stage, seconds)
+    for counter, n in other.counters.items():
+      if counter.startswith('peak'):
+        self.peak(counter, n)
+      else:
+        self.count(counter, n)
+
+  def as_dict(self):
+    return {'timings':dict(self.timings), 'counters':dict(self.counters)}
+
+def current():
+  return _current.get()
+
+@contextmanager
+def record(callback = None):
+  # record the metrics of everything rendered inside, handing them to callback at the end
+  outer = _current.get()
+  metrics = Metrics()
+  token = _current.set(metrics)
+  try:
+    yield metrics
+  finally:
+    _current.reset(token)
+    if outer is not None:
+      outer.merge(metrics)
+    if callback is not None:
+      callback(metrics)
+
+def timed(stage):
+  # decorate a function so that its calls are timed as a stage while recording
+  def decorate(function):
+    @wraps(function)
+    def timed_function(*args, **kwargs):
+      metrics = _current.get()
+      if metrics is None:
+        return function(*args, **kwargs)
+      with metrics.stage(stage):
+        return function(*args, **kwargs)
+    return timed_function
+  return decorate
+
+class TimedIterator():
+  ## iterates, timing how long each item takes to arrive as a stage
+  ## an iterator which runs dry is asked again, so that sources which grow can be timed
+
+  def __init__(self, iterable, stage, metrics):
+    self.iterator = iter(iterable)
+    self.stage = stage
+    self.metrics = metrics
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    start = time.perf_counter()
+    try:
+      return next(self.iterator)
+    finally:
+      self.metrics.time(self.stage, time.perf_counter() - start)
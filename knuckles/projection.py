@@ -0,0 +1,106 @@
+import numpy as np
+
+from .source import Chunked
+
+## projection onto the plane
+  ## points of many dimensions are brought down to the two taken by the space encoders,
+  ## whole arrays at a time, or chunk by chunk for points which do not fit in memory
+
+def _rows(points):
+  # points as an array of shape (rows, dimensions)
+  points = np.asarray(points, dtype=float)
+  return points.reshape(len(points), -1)
+
+def _chunks(points):
+  if isinstance(points, Chunked):
+    return (_rows(chunk) for chunk in points.chunks())
+  return iter([_rows(points)])
+
+class PCA():
+  ## plane of greatest variance of the points, which can be fitted chunk by chunk,
+  ## gathering only the sum of the points and of their outer products
+
+  def __init__(self):
+    self.n = 0
+    self.shift = None # points are summed relative to the first ones, for precision
+    self.total = None
+    self.products = None
+    self.components = None
+
+  def partial_fit(self, points):
+    points = _rows(points)
+    if self.shift is None:
+      self.shift = points.mean(axis=0)
+      self.total = np.zeros(points.shape[1])
+      self.products = np.zeros((points.shape[1], points.shape[1]))
+    points = points - self.shift
+    self.n += len(points)
+    self.total += points.sum(axis=0)
+    self.products += points.T @ points
+    self.components = None
+    return self
+
+  def fit(self, points):
+    for chunk in _chunks(points):
+      self.partial_fit(chunk)
+    return self
+
+  @property
+  def mean(self):
+    return self.shift + self.total / self.n
+
+  def solve(self):
+    # the two directions of greatest variance, each pointing towards its largest coordinate
+    if self.components is None:
+      if not self.n:
+        raise ValueError('PCA needs to be fitted to some points first.')
+      centre = self.total / self.n
+      covariance = self.products / self.n - np.outer(centre, centre)
+      _, vectors = np.linalg.eigh(covariance)
+      components = vectors[:, ::-1][:, :2].T
+      if len(components) < 2:
+        # a single dimension is laid along the first axis
+        components = np.vstack((components, np.zeros_like(components)))
+      signs = np.sign(components[np.arange(2), np.argmax(np.abs(components), axis=1)])
+      self.components = components * np.where(signs == 0, 1, signs)[:, None]
+    return self.components
+
+  def transform(self, points):
+    # coordinates of the points in the plane, as an array of shape (rows, 2)
+    return (_rows(points) - self.mean) @ self.solve().T
+
+class RandomProjection():
+  ## plane spanned by two random orthonormal directions, which needs no fitting
+
+  def __init__(self, dimensions, seed = 0):
+    gaussian = np.random.default_rng(seed).normal(size=(dimensions, 2))
+    components = np.linalg.qr(gaussian)[0].T
+    if len(components) < 2:
+      # a single dimension is laid along the first axis, as in PCA
+      components = np.vstack((components, np.zeros_like(components)))
+    self.components = components
+
+  def fit(self, points):
+    return self
+
+  def transform(self, points):
+    return _rows(points) @ self.components.T
+
+def project(points, method = 'pca', seed = 0):
+  # bring points of shape (rows, dimensions) onto the plane, ready for the space encoders
+  # points : array, or Chunked values read as chunks of rows, see source.read_binary
+  # method : 'pca' or 'random'
+  # returns the x and y coordinates, as arrays or as Chunked values for chunked points
+  if method == 'pca':
+    projection = PCA().fit(points)
+  elif method == 'random':
+    first = next(_chunks(points))
+    projection = RandomProjection(first.shape[1], seed)
+  else:
+    raise ValueError(f'Unknown projection {method}, expected pca or random.')
+
+  if isinstance(points, Chunked):
+    planar = points.map(projection.transform)
+    return Chunked(lambda: (chunk[:, 0] for chunk in planar.chunks())), Chunked(lambda: (chunk[:, 1] for chunk in planar.chunks()))
+  planar = projection.transform(points)
+  return planar[:, 0], planar[:, 1]
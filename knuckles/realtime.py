@@ -0,0 +1,156 @@
+import socket
+import threading
+import time
+
+from . import metrics as mt
+from . import wave as wv
+from .wavfile import framesize, header, pcm
+
+_lookahead = 0.25 # seconds rendered ahead of playback, and buffered before it starts
+
+## real time streaming
+  ## the blocks of a render are sent to a sink as soon as they are mixed, while a player
+  ## is assumed to take them at the framerate once lookahead seconds are buffered
+  ## a render which falls behind the player leaves it without samples, an underrun, after
+  ## which playback waits until lookahead seconds are buffered again
+  ## a sink is anything with a write method taking bytes, such as a file, sys.stdout.buffer,
+  ## a pipe, a SocketSink or a RingBuffer
+
+class SocketSink():
+  ## a local socket the samples are sent through, a unix socket path or a (host, port) pair
+
+  def __init__(self, address):
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    self.socket = socket.socket(family, socket.SOCK_STREAM)
+    self.socket.connect(address)
+
+  def write(self, data):
+    self.socket.sendall(data)
+
+  def close(self):
+    self.socket.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+class RingBuffer():
+  ## bytes passed from a render to a player in another thread, such as an audio callback
+  ## writes wait while the buffer is full, so its capacity bounds how far the render runs ahead
+  ## reads never wait, a player asking for more than is buffered gets it padded with silence
+
+  def __init__(self, capacity):
+    # capacity : bytes held at most
+    self.data = bytearray(capacity)
+    self.start = 0 # position of the first byte held
+    self.size = 0 # bytes held
+    self.closed = False
+    self.underruns = 0 # reads padded with silence before the end of the stream
+    self._changed = threading.Condition()
+
+  def __len__(self):
+    return self.size
+
+  def write(self, data):
+    data = memoryview(data).cast('B')
+    capacity = len(self.data)
+    while len(data):
+      with self._changed:
+        while self.size == capacity and not self.closed:
+          self._changed.wait()
+        if self.closed:
+          raise ValueError('Write to a closed ring buffer.')
+        n = min(len(data), capacity - self.size)
+        at = (self.start + self.size) % capacity
+        first = min(n, capacity - at)
+        self.data[at:at + first] = data[:first]
+        self.data[:n - first] = data[first:n]
+        self.size += n
+        self._changed.notify_all()
+      data = data[n:]
+
+  def read(self, n):
+    # exactly n bytes, padded with silence if fewer are held, or b'' once closed and drained
+    with self._changed:
+      if self.closed and not self.size:
+        return b''
+      m = min(n, self.size)
+      first = min(m, len(self.data) - self.start)
+      out = bytes(self.data[self.start:self.start + first]) + bytes(self.data[:m - first])
+      self.start = (self.start + m) % len(self.data)
+      self.size -= m
+      if m < n and not self.closed:
+        self.underruns += 1
+      self._changed.notify_all()
+    return out + bytes(n - m)
+
+  def close(self):
+    # no more bytes are coming, what is held can still be read
+    with self._changed:
+      self.closed = True
+      self._changed.notify_all()
+
+def stream(sonif, sink, blocksize = None, lookahead = None, sampformat = 'int16', realtime = True, wav = True, framerate = None, mono = False, normalize = None, harmonics = None, preview = False):
+  # send the samples of a sonification to a sink block by block, as they are mixed
+  # blocksize : frames in a block, _blocksize by default
+  # lookahead : seconds buffered before playback starts, and most the render runs ahead of it,
+  #   at least a block, which is the latency of the stream, _lookahead or a block by default
+  # realtime : whether to wait for the player rather than run ahead by more than lookahead,
+  #   otherwise blocks are sent as fast as they come and underruns still counted against the player
+  # wav : whether to send a wav header first, as for files and pipes, or raw samples only
+  # framerate, harmonics, mono, preview : see Sonification.settings
+  # normalize : None to clip or 'limit', see wave.write, peaks are not known until the end
+  # returns a report of the stream, a dict holding the frames sent, the seconds it took,
+  #   the number of underruns and the seconds of playback lost to them, which are also
+  #   recorded as metrics, a render without underruns keeps up with real time
+  framerate, harmonics, nchannels = sonif.settings(framerate, harmonics, mono, preview)
+  blocksize = wv._blocksize if blocksize is None else blocksize
+  # the default lookahead stretches to a block, which lasts longer at low rates
+  lead = max(int(_lookahead * framerate), blocksize) if lookahead is None else int(lookahead * framerate)
+  if lead < blocksize:
+    raise ValueError('The lookahead of a stream needs to hold at least a block.')
+  if normalize == 'peak':
+    raise ValueError('Streams are normalized by a limiter, not by their peak.')
+  nframes = None if sonif.duration is None else int(sonif.duration * framerate)
+  blocks = wv.mixed(sonif.voices(framerate, harmonics), nframes, sonif.spectral, True, nchannels, normalize, blocksize)
+  flush = getattr(sink, 'flush', lambda: None)
+
+  began = time.perf_counter()
+  if wav:
+    sink.write(header(nframes, nchannels, framerate, sampformat))
+  sent = 0 # frames sent so far
+  resumed = None # when playback last started, None while buffering
+  position = 0 # frame playback last started from
+  starved = None # when playback ran out of frames
+  underruns = 0
+  stalled = 0
+  for block in blocks:
+    now = time.perf_counter()
+    if resumed is not None and position + (now - resumed) * framerate > sent:
+      # the player ran out before this block was mixed
+      underruns += 1
+      starved = resumed + (sent - position) / framerate
+      resumed, position = None, sent
+    sink.write(pcm(block, sampformat).data)
+    flush()
+    sent += len(block)
+    now = time.perf_counter()
+    if resumed is None and sent - position >= lead:
+      if starved is not None:
+        stalled += now - starved
+      resumed, starved = now, None
+    if realtime and resumed is not None:
+      ahead = sent - position - (now - resumed) * framerate
+      if ahead > lead:
+        time.sleep((ahead - lead) / framerate)
+  if wav and sent * framesize(nchannels, sampformat) % 2:
+    sink.write(b'\x00')
+    flush()
+
+  m = mt.current()
+  if m is not None:
+    m.count('underruns', underruns)
+    m.time('stalled', stalled)
+  return {'frames':sent, 'seconds':time.perf_counter() - began, 'underruns':underruns, 'stalled':stalled}
@@ -0,0 +1,119 @@
+import csv
+import math
+
+import numpy as np
+
+_chunksize = 1 << 16 # values read at a time
+
+## chunked input
+  ## values which are too many to be held in memory are read one chunk at a time,
+  ## once to find their bounds and once more to be mapped onto sound
+
+class Chunked():
+  ## values read chunk by chunk, anew every time they are iterated over
+
+  def __init__(self, chunks):
+    # chunks : function returning a fresh iterable of chunks of values
+    self._chunks = chunks
+    self._scan = None
+
+  def chunks(self):
+    for chunk in self._chunks():
+      yield np.asarray(chunk, dtype=float)
+
+  def __iter__(self):
+    for chunk in self.chunks():
+      yield from chunk.tolist()
+
+  def scan(self):
+    # a single pass finding the bounds and size of the values, and whether they are sorted
+    if self._scan is None:
+      lo, hi, size, ordered, last = math.inf, -math.inf, 0, True, -math.inf
+      for chunk in self.chunks():
+        if not len(chunk):
+          continue
+        lo = min(lo, chunk.min())
+        hi = max(hi, chunk.max())
+        size += len(chunk)
+        ordered = ordered and chunk[0] >= last and bool(np.all(np.diff(chunk) >= 0))
+        last = chunk[-1]
+      self._scan = {'bounds':(lo, hi), 'size':size, 'ordered':ordered}
+    return self._scan
+
+  def __len__(self):
+    return self.scan()['size']
+
+  def map(self, function):
+    # apply a function to every chunk, lazily
+    return Chunked(lambda: (function(chunk) for chunk in self.chunks()))
+
+def aligned(*sources):
+  # matching chunks of several sources, cut at the boundaries of all of them
+  iterators = [source.chunks() for source in sources]
+  pending = [np.empty(0) for _ in sources]
+  while True:
+    for i, iterator in enumerate(iterators):
+      while not len(pending[i]):
+        pending[i] = next(iterator, None)
+        if pending[i] is None:
+          return
+    size = min(len(chunk) for chunk in pending)
+    yield tuple(chunk[:size] for chunk in pending)
+    pending = [chunk[size:] for chunk in pending]
+
+def combine(function, *sources):
+  # apply a function to matching chunks of several sources
+  return Chunked(lambda: (function(*chunks) for chunks in aligned(*sources)))
+
+def chunked(chunks):
+  # chunks : iterable of arrays which can be iterated over more than once, or a function returning one
+  if callable(chunks):
+    return Chunked(chunks)
+  if iter(chunks) is chunks:
+    raise TypeError('Chunked values are read twice, provide a list of chunks or a function returning them.')
+  return Chunked(lambda: iter(chunks))
+
+def read_binary(fpath, dtype = '<f8', offset = 0, chunksize = None, columns = None):
+  # values stored back to back in a binary file, read a chunk at a time
+  # reading rather than memory mapping keeps only the chunk at hand resident,
+  # however many passes over the file are running at once
+  # columns : if given, values are rows of that many, read as chunks of shape (rows, columns)
+  chunksize = _chunksize if chunksize is None else chunksize
+  width = 1 if columns is None else columns
+  def chunks():
+    with open(fpath, 'rb') as f:
+      f.seek(offset)
+      while True:
+        values = np.fromfile(f, dtype=dtype, count=chunksize * width)
+        values = values[:len(values) - len(values) % width]
+        if not len(values):
+          return
+        yield values if columns is None else values.reshape(-1, columns)
+  return Chunked(chunks)
+
+def read_csv(fpath, column = 0, delimiter = ',', header = False, chunksize = None):
+  # values in a column of a csv file, given by position or, with a header, by name
+  # a list of columns gives rows, read as chunks of shape (rows, columns)
+  chunksize = _chunksize if chunksize is None else chunksize
+  def chunks():
+    with open(fpath, newline='') as f:
+      rows = csv.reader(f, delimiter=delimiter)
+      names = next(rows) if header else None
+      find = lambda c: c if isinstance(c, int) else names.index(c)
+      if isinstance(column, (list, tuple)):
+        indices = [find(c) for c in column]
+        read = lambda row: [float(row[i]) for i in indices]
+      else:
+        index = find(column)
+        read = lambda row: float(row[index])
+      chunk = []
+      for row in rows:
+        if not row:
+          continue
+        chunk.append(read(row))
+        if len(chunk) == chunksize:
+          yield chunk
+          chunk = []
+      if chunk:
+        yield chunk
+  return Chunked(chunks)
@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+
+_hop = 1024 # frames between the starts of consecutive synthesis windows
+_width = 8 # bins on each side of a partial which are written into the spectrum
+
+## spectral synthesis of steady sinusoids
+  ## every window of 2*hop frames is built directly in the frequency domain and brought back
+  ## with an inverse fft, the hann windows overlap by half and sum to one, so adding them up
+  ## gives back the sinusoids. only _width bins around each partial are kept, which keeps each
+  ## partial within 0.25% of its amplitude, and makes the cost of a window grow with the number
+  ## of partials rather than the number of frames.
+
+def dirichlet(nu, size):
+  # transform of a rectangular window of a given size at fractional bins nu
+  nu = np.asarray(nu, dtype=float)
+  denominator = np.sin(math.pi * nu / size)
+  degenerate = np.abs(denominator) < 1e-12
+  nu = np.where(degenerate, 1, nu)
+  denominator = np.where(degenerate, 1, denominator)
+  kernel = np.exp(-1j * math.pi * nu * (size - 1) / size) * np.sin(math.pi * nu) / denominator
+  return np.where(degenerate, size, kernel)
+
+def hann_kernel(nu, size):
+  # transform of a periodic hann window of a given size at fractional bins nu
+  return 0.5 * dirichlet(nu, size) - 0.25 * dirichlet(nu - 1, size) - 0.25 * dirichlet(nu + 1, size)
+
+class SpectralBank():
+  ## sum of never ending sinusoids amp * sin(tau * period * i), synthesised window by window
+  ## periods are counted in cycles per frame, amplitudes are given per channel
+
+  def __init__(self, periods, amplitudes, hop = None, width = None):
+    self.hop = _hop if hop is None else hop
+    self.size = 2 * self.hop
+    width = _width if width is None else width
+
+    self.periods = np.asarray(periods, dtype=float)
+    self.amplitudes = np.asarray(amplitudes, dtype=float).reshape(len(self.periods), -1)
+
+    # the kernel of each partial depends only on its position between bins
+    # so it is computed once and shifted into place in every window
+    position = self.periods * self.size
+    base = np.floor(position)
+    spread = np.arange(1 - width, width + 1)
+    self.bins = (base[:, None] + spread).astype(int) % self.size
+    self.kernel = hann_kernel(spread - (position - base)[:, None], self.size)
+    self._windows = {}
+
+  def window(self, j):
+    # window j covers frames [(j - 1) * hop, (j + 1) * hop)
+    if j not in self._windows:
+      start = (j - 1) * self.hop
+      phase = np.exp(1j * np.mod(math.tau * self.periods * start, math.tau)) / 2j
+      bins = self.bins.ravel()
+      mirror = -np.arange(self.size // 2 + 1) % self.size
+      channels = []
+      for amplitude in self.amplitudes.T:
+        weights = ((amplitude * phase)[:, None] * self.kernel).ravel()
+        spectrum = np.bincount(bins, weights.real, self.size) + 1j * np.bincount(bins, weights.imag, self.size)
+        # the negative frequencies of a real signal mirror the positive ones
+        channels.append(np.fft.irfft(spectrum[:self.size // 2 + 1] + np.conj(spectrum[mirror]), self.size))
+      self._windows[j] = np.stack(channels, axis=1)
+    return self._windows[j]
+
+  def block(self, start, nframes):
+    # frames [start, start + nframes) of the sum, as an array of shape (frames, channels)
+    stop = start + nframes
+    block = np.zeros((nframes, self.amplitudes.shape[1]))
+    first = start // self.hop
+    for j in range(first, (stop - 1) // self.hop + 2):
+      lo = max(start, (j - 1) * self.hop)
+      hi = min(stop, (j + 1) * self.hop)
+      offset = (j - 1) * self.hop
+      block[lo - start:hi - start] += self.window(j)[lo - offset:hi - offset]
+    # windows behind this block will not be needed again
+    for j in [j for j in self._windows if j < first]:
+      del self._windows[j]
+    return block
@@ -1,11 +1,32 @@
+import copy
+import heapq
 import math
 import operator
-from functools import reduce
-from itertools import chain, count, islice, repeat
+import os
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, reduce
+from itertools import chain, count, groupby, repeat
 
-from wavebender import write_wavefile
+import numpy as np
+
+from . import metrics as mt
+from .dynamics import limit
+from .spectral import SpectralBank
+from .wavfile import WavWriter, allocate, framesize, header, pcm, samples
 
 _framerate = 48000
+_blocksize = 4096
+_tablesize = 8192 # samples per period of a wavetable
+_band = 0.42 # highest harmonic of a shape in cycles per frame, 20160Hz at 48kHz
+_tablecache = 64 # number of wavetables kept in memory
+_graincache = 64 # number of grains kept after their waves have finished
+_envelopecache = 64 # number of envelope tables kept in memory
+_voicechunk = 1 << 12 # waves made at a time out of a VoiceBank
+_previewrate = 12000 # sample rate of previews
+_minframerate = 8000 # lowest sample rate of a render, at which blocks are longest
+_previewharmonics = 8 # most harmonics of a shape in previews
 
 ## useful maths
 
@@ -21,6 +42,15 @@ def bump(x, length = 1):
   x = x / length
   return 14.806*x - 72.471*x**2 + 135.61*x**3 - 112.46*x**4 + 34.517*x**5
 
+def adsr(x, length = 1):
+  # attack to the peak of a bump, decay, sustain and release linearly
+  return np.interp(x / length, (0, 1/6, 1/3, 0.7, 1), (0, 1, 0.6, 0.6, 0))
+
+def decay(x, length = 1):
+  # quick attack, then an exponential decay falling by 60dB over the length
+  x = x / length
+  return np.minimum(x / 0.01, 1) * np.exp(-math.log(1000) * x)
+
 ## fool proofing
   ## functions that check if all atheartbutes are inside their given range
 
@@ -41,35 +71,101 @@ def rAmp(balance):
   return math.sqrt(2) * (math.cos(balance) - math.sin(balance)) / 2
 
 ## wave shapes
+  ## x may be a single frame index or an array of them
+  ## period is counted in cycles per frame, so the thresholds and bands below scale
+  ## with the sample rate, every harmonic staying below _band times whichever it is
+  ## limit caps the number of harmonics of the shapes which are sums of sines
 
-def sine(x, period):
-  return math.sin(math.tau * period * x)
+def sine(x, period, limit = None):
+  return np.sin(math.tau * period * x)
 
-def saw(x, period):
+def saw(x, period, limit = None):
   if period * _framerate < 3456:
-    return (8 / math.tau) * math.atan(math.tan(x * math.tau *  period / 2))
+    return (8 / math.tau) * np.arctan(np.tan(x * math.tau *  period / 2))
   else:
-    return sumsine(x, period, 1)
+    return sumsine(x, period, 1, limit)
 
-def square(x, period):
+def square(x, period, limit = None):
   if period * _framerate < 3456:
-    return sign(sine(x, period))
+    return np.sign(sine(x, period))
   else:
-    return sumsine(x, period, 2)
-
-def heart(x, period):
-  return sumsine(x, period, 3)
-
-def funnel(x, period):
-  return sumsine(x, period, 4)
-
-def sumsine(x, period, mod):
-  n = math.floor(((20000 / (period * _framerate)) + 1) / mod) + 1
-  return 4 * mod * sum(math.pow(-1, k*mod) * math.sin(math.tau * period * x * (mod*k+1)) / (mod*k+1) for k in range(n)) / math.tau
+    return sumsine(x, period, 2, limit)
+
+def heart(x, period, limit = None):
+  return sumsine(x, period, 3, limit)
+
+def funnel(x, period, limit = None):
+  return sumsine(x, period, 4, limit)
+
+def harmonics(n, mod):
+  # the first n odd or even harmonics making up the shapes above, with their weights
+  multiples = mod * np.arange(n) + 1
+  weights = 4 * mod * np.power(-1.0, np.arange(n) * mod) / (math.tau * multiples)
+  return multiples, weights
+
+def harmonic_sum(x, n, mod):
+  # sum of the harmonics over phase x
+  multiples, weights = harmonics(n, mod)
+  return np.sin(np.multiply.outer(math.tau * np.asarray(x, dtype=float), multiples)) @ weights
+
+def band(period, mod, limit = None):
+  # number of harmonics which stay below _band cycles per frame, the fundamental at least, at most limit
+  # the nth harmonic sounds at (mod * (n - 1) + 1) * period
+  n = max(1, math.floor((_band / period - 1) / mod) + 1)
+  return n if limit is None else max(1, min(n, limit))
+
+@lru_cache(maxsize=_tablecache)
+def wavetable(mod, n):
+  # one period of a band limited harmonic shape, with the first sample repeated at the end
+  table = harmonic_sum(np.arange(_tablesize + 1) / _tablesize, n, mod)
+  table.flags.writeable = False
+  return table
+
+def sumsine(x, period, mod, limit = None):
+  # the number of harmonics kept below the band picks the wavetable
+  table = wavetable(mod, band(period, mod, limit))
+  position = np.mod(period * np.asarray(x, dtype=float), 1) * _tablesize
+  index = position.astype(int)
+  fraction = position - index
+  return table[index] + fraction * (table[index + 1] - table[index])
+
+## envelopes
+  ## any function of (x, length) on arrays can be added here and used by name
+
+_envelopes = {'bump':bump, 'adsr':adsr, 'decay':decay}
+
+@lru_cache(maxsize=_envelopecache)
+def envelope(name, length):
+  # table of an envelope over length frames, shared by every wave using it
+  table = _envelopes[name](np.arange(length, dtype=float), length)
+  table.flags.writeable = False
+  return table
 
 ## base waves
 
 _wvshapes = {'sine':sine, 'square':square, 'saw':saw, 'heart':heart, 'funnel':funnel}
+_wvmods = {'saw':1, 'square':2, 'heart':3, 'funnel':4}
+
+def partials(shape, period, limit = None):
+  # multiples of the frequency and their weights making up a shape
+  # None if the shape is not a sum of sines at this period
+  if shape == 'sine':
+    return np.ones(1), np.ones(1)
+  if shape in ('saw', 'square') and period * _framerate < 3456:
+    return None
+  mod = _wvmods[shape]
+  return harmonics(band(period, mod, limit), mod)
+
+def retuned(w, framerate = None, limit = None):
+  # a copy of a wave sounding the same at another sample rate, with at most limit harmonics
+  scale = (_framerate if framerate is None else framerate) / _framerate
+  w = copy.copy(w)
+  w.period = w.period / scale
+  w.offset = int(w.offset * scale)
+  if isinstance(w, Blip):
+    w.duration = int(w.duration * scale)
+  w.harmonics = limit
+  return w
 
 class Wave():
   def __init__(self, shape = 'sine', frequency = 432.0, amplitude = 0.12, offset = 0, balance = 0):
@@ -82,9 +178,44 @@ class Wave():
     self.lAmp = lAmp(balance)
     self.rAmp = rAmp(balance)
 
+  ## length of the wave in frames, None if it never ends
+  length = None
+  ## most harmonics of shapes which are sums of sines, see retuned
+  harmonics = None
+
+  @property
+  def end(self):
+    # first frame after the wave, None if it never ends
+    if self.length is None:
+      return None
+    return self.offset + self.length
+
+  def shape_block(self, start, nframes):
+    # frames [start, start + nframes) counted from the beginning of the wave, at unit amplitude
+    x = np.arange(start, start + nframes, dtype=float)
+    return _wvshapes[self.shape](x, self.period, self.harmonics)
+
+  def mono_block(self, start, nframes, amp = 1):
+    return amp * float(self.amplitude) * self.shape_block(start, nframes)
+
+  def partials(self):
+    return partials(self.shape, self.period, self.harmonics)
+
+  def voice_key(self):
+    # waves sharing a key differ only in amplitude, and can be mixed as one voice
+    return (type(self), self.shape, self.period, self.offset, self.lAmp, self.rAmp, self.grain_key())
+
+  def grain_key(self):
+    # waves sharing a key sound the same up to amplitude, balance and offset
+    # never ending waves are not worth storing
+    return None
+
   def mono_generator(self, amp = 1):
-    for i in count():
-      yield amp * float(self.amplitude) * _wvshapes[self.shape](float(i), self.period)
+    for start in count(0, _blocksize):
+      nframes = _blocksize if self.length is None else min(_blocksize, self.length - start)
+      if nframes <= 0:
+        return
+      yield from self.mono_block(start, nframes, amp).tolist()
 
   def left_generator(self):
     return self.mono_generator(amp=self.lAmp)
@@ -118,55 +249,517 @@ class Blip(Wave):
     super().__init__(**kwargs)
     self.duration = int(duration * _framerate)
 
-  def mono_generator(self, amp = 1):
-    return islice(super().mono_generator(amp), self.duration)
+  @property
+  def length(self):
+    return self.duration
+
+  def grain_key(self):
+    return (type(self), self.shape, self.period, self.duration)
 
 class Plop(Blip):
   ## short decaying chunks of sound of a given shape
   ## duration is counted in seconds for all shapes
+  ## envelope is one of the names in _envelopes
 
-  def mono_generator(self, amp = 1):
-    for i, s in zip(count(), super().mono_generator(amp)):
-      yield s * bump(i, self.duration)
+  def __init__(self, envelope = 'bump', **kwargs):
+    super().__init__(**kwargs)
+    self.envelope = envelope
+
+  def shape_block(self, start, nframes):
+    return super().shape_block(start, nframes) * envelope(self.envelope, self.duration)[start:start + nframes]
+
+  def grain_key(self):
+    return super().grain_key() + (self.envelope,)
+
+class Waves():
+  ## waves made anew each time they are iterated over
+
+  def __init__(self, make):
+    # make : function returning an iterable of waves
+    self.make = make
+
+  def __iter__(self):
+    return iter(self.make())
+
+def _shared(column):
+  # whether a column holds a single value broadcast to every voice, see VoiceBank
+  return column.ndim == 1 and len(column) > 1 and column.strides[0] == 0
+
+def _mapped(column, function):
+  # apply a function to a column, computing a shared value only once and keeping it shared
+  return np.broadcast_to(function(column[:1]), column.shape) if _shared(column) else function(column)
+
+class VoiceBank():
+  ## many waves of one kind held as columns of arrays rather than an object each
+  ## shape ids, periods, amplitudes, offsets, durations and pan gains take a few
+  ## bytes per voice, and waves are only made as they are read, a chunk at a time
+  ## values given as scalars are shared by every voice without being repeated
+
+  def __init__(self, kind = Wave, shape = 'sine', frequency = 432.0, amplitude = 0.12, offset = 0, balance = 0, duration = 0.7, envelope = 'bump'):
+    # kind : Wave, Blip or Plop, the other arguments are those of the kind, either scalars or arrays
+    size = np.broadcast(*(np.asarray(v) for v in (frequency, amplitude, offset, balance, duration))).shape
+    column = lambda v, dtype = float: np.broadcast_to(np.asarray(v, dtype=dtype), size)
+    self.kind = kind
+    if isinstance(shape, str):
+      self.shapes = (shape,)
+      self.shape = column(0, np.uint8)
+    else:
+      self.shapes, shape = np.unique(np.asarray(shape, dtype=str), return_inverse=True)
+      self.shapes = tuple(self.shapes.tolist())
+      self.shape = column(shape.astype(np.uint8))
+    self.period = _mapped(column(frequency), lambda f: f / float(_framerate))
+    self.amplitude = _mapped(column(amplitude), lambda a: np.clip(a, -1, 1))
+    self.offset = _mapped(column(offset), lambda o: (o * _framerate).astype(np.int64))
+    balance = column(balance)
+    self.left = _mapped(balance, lambda b: math.sqrt(2) * (np.cos(b) + np.sin(b)) / 2)
+    self.right = _mapped(balance, lambda b: math.sqrt(2) * (np.cos(b) - np.sin(b)) / 2)
+    self.duration = _mapped(column(duration), lambda d: (d * _framerate).astype(np.int64)) if issubclass(kind, Blip) else None
+    self.envelope = envelope if issubclass(kind, Plop) else None
+    self.harmonics = None
+
+  def __len__(self):
+    return len(self.period)
+
+  def columns(self):
+    # the arrays of the bank by the attribute of the waves they hold
+    columns = {'shape':self.shape, 'period':self.period, 'amplitude':self.amplitude, 'offset':self.offset, 'lAmp':self.left, 'rAmp':self.right}
+    if self.duration is not None:
+      columns['duration'] = self.duration
+    return columns
+
+  def __iter__(self):
+    columns = self.columns()
+    names = list(columns)
+    for start in range(0, len(self), _voicechunk):
+      for values in zip(*(columns[name][start:start + _voicechunk].tolist() for name in names)):
+        w = self.kind.__new__(self.kind)
+        w.__dict__.update(zip(names, values))
+        w.shape = self.shapes[w.shape]
+        if self.envelope is not None:
+          w.envelope = self.envelope
+        if self.harmonics is not None:
+          w.harmonics = self.harmonics
+        yield w
+
+  def retuned(self, framerate = None, limit = None):
+    # the same voices at another sample rate, see retuned
+    scale = (_framerate if framerate is None else framerate) / _framerate
+    bank = copy.copy(self)
+    bank.period = _mapped(self.period, lambda p: p / scale)
+    bank.offset = _mapped(self.offset, lambda o: (o * scale).astype(np.int64))
+    if self.duration is not None:
+      bank.duration = _mapped(self.duration, lambda d: (d * scale).astype(np.int64))
+    bank.harmonics = limit
+    return bank
+
+  def sorted(self):
+    # the same voices sorted by offset, keeping the order of those starting together
+    order = np.argsort(self.offset, kind='stable')
+    bank = copy.copy(self)
+    for name, column in self.columns().items():
+      setattr(bank, {'lAmp':'left', 'rAmp':'right'}.get(name, name), column if _shared(column) else column[order])
+    return bank
 
 class Sonification():
   ## collection of waves ready to be sonified
-
-  def __init__(self, waves, duration, filename = 'sonification'):
-    self.waves = waves
+  ## it is a sum of parts, each a collection of waves with a gain, which is only
+  ## compiled into a flat list of voices when rendered, so it can be rendered many times
+
+  def __init__(self, waves, duration, filename = 'sonification', spectral = False, ordered = False):
+    if iter(waves) is waves:
+      # waves which can only be read once are kept, so that they can be read again
+      waves = list(waves)
+    # waves in ordered parts come sorted by offset, so they can be streamed without gathering them
+    self.parts = [(1, waves, ordered)]
     self.duration = duration
     self.filename = filename
+    # synthesise steady waves in the frequency domain, see compute_blocks
+    self.spectral = spectral
+
+  @property
+  def ordered(self):
+    return all(ordered for _, _, ordered in self.parts)
+
+  @property
+  def waves(self):
+    return self.voices()
 
   def __add__(self, other):
-    return Sonification(chain(self.waves, other.waves), max(self.duration, other.duration))
+    sonif = Sonification([], max(self.duration, other.duration), spectral=self.spectral and other.spectral)
+    sonif.parts = self.parts + other.parts
+    return sonif
+
+  def scaled(self, gain):
+    # the same waves, louder or quieter by a factor of gain
+    sonif = Sonification([], self.duration, self.filename, self.spectral)
+    sonif.parts = [(g * gain, waves, ordered) for g, waves, ordered in self.parts]
+    return sonif
 
-  def render(self, filename = None):
+  def flip_phase(self):
+    self.parts = [(-g, waves, ordered) for g, waves, ordered in self.parts]
+    return self
+
+  def voices(self, framerate = None, harmonics = None):
+    '''
+    compile the parts into a single stream of waves sorted by offset, with
+    the gains of their parts folded into their amplitudes. waves starting
+    together which differ only in amplitude are merged into one, and
+    dropped if they cancel out. given a framerate other than _framerate or
+    a most number of harmonics, the waves are retuned to match.
+    '''
+    offset = lambda w: w.offset
+    retune = framerate not in (None, _framerate) or harmonics is not None
+    streams = []
+    for gain, waves, ordered in self.parts:
+      if not ordered:
+        waves = waves.sorted() if isinstance(waves, VoiceBank) else sorted(waves, key=offset)
+      if retune:
+        waves = waves.retuned(framerate, harmonics) if isinstance(waves, VoiceBank) else (retuned(w, framerate, harmonics) for w in waves)
+      streams.append(zip(repeat(gain), waves))
+
+    for _, together in groupby(heapq.merge(*streams, key=lambda v: v[1].offset), key=lambda v: v[1].offset):
+      merged = {}
+      for gain, w in together:
+        key = w.voice_key()
+        if key in merged:
+          amplitude, first, _ = merged[key]
+          merged[key] = (amplitude + gain * float(w.amplitude), first, True)
+        else:
+          merged[key] = (gain * float(w.amplitude), w, gain != 1)
+      for amplitude, w, changed in merged.values():
+        if not amplitude:
+          continue
+        if changed:
+          w = copy.copy(w)
+          w.amplitude = amplitude
+        yield w
+
+  def settings(self, framerate = None, harmonics = None, mono = False, preview = False):
+    # framerate, most harmonics and number of channels of a render
+    # previews default to a lower rate and fewer harmonics, for a quick listen
+    if preview:
+      framerate = _previewrate if framerate is None else framerate
+      harmonics = _previewharmonics if harmonics is None else harmonics
+    framerate = _framerate if framerate is None else framerate
+    if framerate < _minframerate:
+      raise ValueError(f'Renders are made at {_minframerate}Hz or more, not {framerate}Hz.')
+    return framerate, harmonics, (1 if mono else 2)
+
+  def render(self, filename = None, sampformat = 'int16', workers = None, metrics = None, framerate = None, harmonics = None, mono = False, preview = False, normalize = None):
+    # sampformat : one of 'int16', 'int24', 'float32'
+    # workers : number of processes sharing the render, see write
+    # metrics : function called with the Metrics of the render, which is only instrumented if given
+    # framerate, harmonics, mono, preview : see settings, the sonification itself is left as it is
+    # normalize : None to clip, 'limit' or 'peak', see write
     if filename is not None:
       self.filename = filename
-    write(fpath=f'{self.filename}.wav', waves=self.waves, duration=self.duration)
+    framerate, harmonics, nchannels = self.settings(framerate, harmonics, mono, preview)
+    if metrics is None:
+      write(fpath=f'{self.filename}.wav', waves=self.voices(framerate, harmonics), duration=self.duration, spectral=self.spectral, sampformat=sampformat, workers=workers, ordered=True, framerate=framerate, nchannels=nchannels, normalize=normalize)
+      return
+    with mt.record(metrics) as m:
+      with m.stage('compiling'):
+        waves = list(self.voices(framerate, harmonics))
+      write(fpath=f'{self.filename}.wav', waves=waves, duration=self.duration, spectral=self.spectral, sampformat=sampformat, workers=workers, ordered=True, framerate=framerate, nchannels=nchannels, normalize=normalize)
+
+  def to_array(self, dtype = 'float32', framerate = None, harmonics = None, mono = False, preview = False, normalize = None):
+    # the samples as an array of shape (frames, channels), floats in [-1, 1] or int16
+    framerate, harmonics, nchannels = self.settings(framerate, harmonics, mono, preview)
+    return render_array(self.voices(framerate, harmonics), self.duration, spectral=self.spectral, dtype=dtype, ordered=True, framerate=framerate, nchannels=nchannels, normalize=normalize)
+
+  def to_bytes(self, sampformat = 'int16', framerate = None, harmonics = None, mono = False, preview = False, normalize = None):
+    # the whole wav file in memory, ready to be served, normalized by a limiter at most
+    framerate, harmonics, nchannels = self.settings(framerate, harmonics, mono, preview)
+    return render_bytes(self.voices(framerate, harmonics), self.duration, spectral=self.spectral, sampformat=sampformat, ordered=True, framerate=framerate, nchannels=nchannels, normalize=normalize)
+
+  def to_memmap(self, filename = None, sampformat = 'int16', workers = None, **settings):
+    # render into {filename}.wav and map its samples, see wavfile.samples
+    self.render(filename, sampformat=sampformat, workers=workers, **settings)
+    return samples(f'{self.filename}.wav')
 
-  def flip_phase(self):
-    self.waves = (w.flip_phase() for w in self.waves)
 ## wav creation
 
-### the following two functions should be combined into one, implementing the Wave class
-def compute_samples(channels, nsamples=None):
+def gains(w, nchannels = 2):
+  # gain of a wave in each channel, mono taking the middle of the pan
+  if nchannels == 1:
+    return ((w.lAmp + w.rAmp) / 2,)
+  return (w.lAmp, w.rAmp)
+
+def spectral_bank(waves, nchannels = 2):
+  # gather the partials of the waves into a single bank
+  periods, amplitudes = [], []
+  for w in waves:
+    multiples, weights = w.partials()
+    periods.append(w.period * multiples)
+    amplitudes.append(np.outer(float(w.amplitude) * weights, gains(w, nchannels)))
+  return SpectralBank(np.concatenate(periods), np.concatenate(amplitudes))
+
+def compute_blocks(waves, nframes = None, blocksize = None, spectral = False, first = 0, ordered = False, nchannels = 2, clip = True):
   '''
-  create a generator which computes the samples.
-  essentially it creates a sequence of the sum of each function in the channel
-  at each sample in the file for each channel.
+  create a generator which computes the samples block by block.
+  every block is an array of shape (frames, nchannels) holding the sum of
+  the waves overlapping it in each channel, clipped to [-1, 1] if clip.
+  waves are indexed by their starting frame, so each block only touches
+  the waves which are sounding during it. if they are ordered by offset
+  already, they are drawn from the iterable only as they start.
+  waves which differ only in amplitude, balance and offset are synthesised
+  once as a grain, which is then stamped at each of their offsets.
+  if spectral is set, never ending waves starting at the beginning whose
+  shape is a sum of sines are synthesised together by a SpectralBank,
+  which is within 0.25% of the amplitude of each of their partials.
+  blocks start at frame first, which should be a multiple of blocksize
+  for the blocks to line up with those of a render from the beginning.
+  an ordered iterator which runs dry is asked again at every block, so
+  waves can keep being added to it while the blocks are drawn, see live.
+  while metrics are recorded where the generator is created, the time spent
+  making waves, synthesising and mixing them is reported, along with the
+  number of voices, the most sounding at once, the frames rendered and the
+  samples clipped, wherever the blocks are then drawn.
   '''
-  return islice(zip(*(map(safe_sum, zip(*channel)) for channel in channels)), nsamples)
-
-def _samples(waves, duration = None):
-  signal = (s for s in zip(*(w.signal() for w in waves)))
-  
-  if duration is not None:
-    duration = int(duration * _framerate)
-  return compute_samples(signal, duration)
-
-def write(fpath, waves, duration):
+  return _blocks(waves, nframes, blocksize, spectral, first, ordered, nchannels, clip, mt.current())
+
+def _blocks(waves, nframes, blocksize, spectral, first, ordered, nchannels, clip, m):
+  # the generator of compute_blocks, reporting to the metrics m if not None
+  if m is not None:
+    waves = mt.TimedIterator(waves, 'waves', m)
+  if not ordered or spectral:
+    waves = sorted(waves, key=lambda w: w.offset)
+  bank = None
+  banked = 0 # waves sounding in the bank
+  if spectral:
+    steady = [w.end is None and w.offset == 0 and w.partials() is not None for w in waves]
+    if any(steady):
+      bank = spectral_bank((w for w, s in zip(waves, steady) if s), nchannels)
+      waves = [w for w, s in zip(waves, steady) if not s]
+      banked = sum(steady)
+      if m is not None:
+        m.count('voices', banked)
+  waves = iter(waves)
+  if blocksize is None:
+    blocksize = _blocksize
+
+  # a grain is made once two sounding waves share it, and kept while any of them sounds
+  # afterwards the most recently used ones are kept in case the sound returns
+  sounding = Counter()
+  grains = {}
+  retired = OrderedDict()
+
+  upcoming = None # first wave which has not started yet
+  active = []
+  for start in count(first, blocksize):
+    if nframes is not None:
+      if start >= nframes:
+        return
+      blocksize = min(blocksize, nframes - start)
+    stop = start + blocksize
+    if upcoming is None:
+      upcoming = next(waves, None)
+    if m is not None:
+      began = time.perf_counter()
+      synthesis = 0
+      carried = len(active)
+      waiting = m.timings.get('waves', 0)
+
+    while upcoming is not None and upcoming.offset < stop:
+      w, key = upcoming, upcoming.grain_key()
+      upcoming = next(waves, None)
+      if w.end is not None and w.end <= start:
+        continue
+      if key is not None:
+        if key in retired:
+          grains[key] = retired.pop(key)
+        elif key not in grains and sounding[key]:
+          if m is not None:
+            tick = time.perf_counter()
+          grains[key] = w.shape_block(0, w.length)
+          if m is not None:
+            synthesis += time.perf_counter() - tick
+        sounding[key] += 1
+      active.append((w, key, gains(w, nchannels)))
+
+    if m is not None:
+      tick = time.perf_counter()
+    block = np.zeros((blocksize, nchannels)) if bank is None else bank.block(start, blocksize)
+    if m is not None:
+      synthesis += time.perf_counter() - tick
+    for w, key, pan in active:
+      # position of the block relative to the beginning of the wave
+      lo = max(start, w.offset)
+      hi = stop if w.end is None else min(stop, w.end)
+      if m is not None:
+        tick = time.perf_counter()
+      if key in grains:
+        mono = float(w.amplitude) * grains[key][lo - w.offset:hi - w.offset]
+      else:
+        mono = w.mono_block(lo - w.offset, hi - lo)
+      if m is not None:
+        synthesis += time.perf_counter() - tick
+      for channel, gain in enumerate(pan):
+        block[lo - start:hi - start, channel] += gain * mono
+
+    still_active = []
+    for voice in active:
+      w, key, _ = voice
+      if w.end is None or w.end > stop:
+        still_active.append(voice)
+      elif key is not None:
+        sounding[key] -= 1
+        if not sounding[key]:
+          del sounding[key]
+          if key in grains:
+            retired[key] = grains.pop(key)
+            if len(retired) > _graincache:
+              retired.popitem(last=False)
+    if m is not None:
+      m.count('voices', len(active) - carried)
+      m.peak('peak_voices', banked + len(active))
+      m.count('frames', blocksize)
+      m.count('clipped', int(np.count_nonzero(np.abs(block) > 1)))
+      m.time('synthesis', synthesis)
+      m.time('mixing', time.perf_counter() - began - synthesis - (m.timings.get('waves', 0) - waiting))
+    active = still_active
+    yield np.clip(block, -1, 1, out=block) if clip else block
+
+## parallel rendering
+  ## the timeline is cut into segments on block boundaries, each worker process
+  ## renders the waves overlapping a segment and writes it straight into its place
+  ## in the output file, giving the same bytes as a render on a single core
+
+_segments = 4 # segments per worker, to even out their load
+_worker = {} # waves of the render the current worker process is taking part in
+
+def _init_worker(waves, spectral, nchannels = 2):
+  _worker['waves'] = waves
+  _worker['offsets'] = np.array([w.offset for w in waves])
+  _worker['ends'] = np.array([math.inf if w.end is None else w.end for w in waves])
+  _worker['spectral'] = spectral
+  _worker['nchannels'] = nchannels
+
+def _render_segment(fpath, position, start, stop, sampformat, recording = False):
+  # position : byte at which the samples start in the file
+  # recording : whether to return the metrics of the segment, for the parent to merge
+  if recording:
+    with mt.record() as metrics:
+      _render_segment(fpath, position, start, stop, sampformat)
+    return metrics.as_dict()
+  overlapping = np.nonzero((_worker['offsets'] < stop) & (_worker['ends'] > start))[0]
+  waves = [_worker['waves'][i] for i in overlapping]
+
+  size = framesize(_worker['nchannels'], sampformat)
+  samples = np.memmap(fpath, dtype=np.uint8, mode='r+', offset=position + start * size, shape=((stop - start) * size,))
+  at = 0
+  m = mt.current()
+  for block in compute_blocks(waves, stop, spectral=_worker['spectral'], first=start, nchannels=_worker['nchannels']):
+    began = time.perf_counter() if m is not None else None
+    data = np.frombuffer(pcm(block, sampformat), dtype=np.uint8)
+    samples[at:at + len(data)] = data
+    at += len(data)
+    if m is not None:
+      m.time('encoding', time.perf_counter() - began)
+  samples.flush()
+
+_normalizations = (None, 'limit', 'peak')
+
+def mixed(waves, nframes, spectral = False, ordered = False, nchannels = 2, normalize = None, blocksize = None):
+  # blocks of a render, clipped, or brought under full scale by a limiter if normalize is 'limit'
+  # or left as they are for 'peak', which is applied once the whole render is known
+  if normalize not in _normalizations:
+    raise ValueError(f'Unknown normalization {normalize}, expected one of {", ".join(map(str, _normalizations))}.')
+  blocks = compute_blocks(waves, nframes, blocksize, spectral=spectral, ordered=ordered, nchannels=nchannels, clip=normalize is None)
+  return limit(blocks) if normalize == 'limit' else blocks
+
+def peak_gain(peak):
+  # gain bringing a peak to full scale, never raising quiet renders
+  return 1 / peak if peak > 1 else 1
+
+def render_array(waves, duration, spectral = False, dtype = 'float32', ordered = False, framerate = _framerate, nchannels = 2, normalize = None):
+  # render straight into an array of shape (frames, nchannels) of floats or int16
+  dtype = np.dtype(dtype)
+  if dtype.kind != 'f' and dtype != np.int16:
+    raise ValueError(f'Samples are rendered as floats or int16, not {dtype}.')
+  nframes = int(duration * framerate)
+  # peak normalized renders are gathered as floats and scaled once they are whole
+  out = np.empty((nframes, nchannels), dtype=np.float64 if normalize == 'peak' and dtype.kind != 'f' else dtype)
+  at = 0
+  for block in mixed(waves, nframes, spectral, ordered, nchannels, normalize):
+    out[at:at + len(block)] = block if out.dtype.kind == 'f' else pcm(block, 'int16')
+    at += len(block)
+  if normalize == 'peak':
+    out *= peak_gain(np.max(np.abs(out), initial=0))
+    return out if dtype.kind == 'f' else pcm(out, 'int16')
+  return out
+
+def render_bytes(waves, duration, spectral = False, sampformat = 'int16', ordered = False, framerate = _framerate, nchannels = 2, normalize = None):
+  # render a whole wav file into a single bytearray, filled in place
+  if normalize == 'peak':
+    raise ValueError('Renders into bytes are normalized by a limiter, not by their peak.')
+  nframes = int(duration * framerate)
+  head = header(nframes, nchannels, framerate, sampformat)
+  datasize = nframes * framesize(nchannels, sampformat)
+  out = bytearray(len(head) + datasize + datasize % 2)
+  out[:len(head)] = head
+  view = np.frombuffer(out, dtype=np.uint8)
+  at = len(head)
+  for block in mixed(waves, nframes, spectral, ordered, nchannels, normalize):
+    data = pcm(block, sampformat).view(np.uint8).reshape(-1)
+    view[at:at + len(data)] = data
+    at += len(data)
+  return out
+
+def write(fpath, waves, duration, spectral = False, sampformat = 'int16', workers = None, ordered = False, framerate = _framerate, nchannels = 2, normalize = None):
   # fpath : path to write file to
-  # waves : waves
-  write_wavefile(fpath, samples=_samples(waves, duration), nchannels=2, sampwidth=2, framerate=_framerate, bufsize=2048)
+  # waves : waves, tuned to framerate, see retuned
+  # workers : if more than one, number of processes rendering in parallel
+  # ordered : whether the waves are sorted by offset already
+  # nchannels : 2 for stereo, 1 for mono
+  # normalize : None to clip, 'limit' for a lookahead limiter, or 'peak' to scale the whole
+  #   render to full scale, which is rendered once into a provisional float file and then rescaled
+  nframes = None if duration is None else int(duration * framerate)
+  if workers is not None and workers > 1 and normalize is not None:
+    raise ValueError('Normalized renders run in a single process, as their gain carries on from block to block.')
+  if normalize == 'peak':
+    provisional = f'{fpath}.part'
+    try:
+      with open(provisional, 'wb') as f, WavWriter(f, nchannels=nchannels, framerate=framerate, sampformat='float32', nframes=nframes) as writer:
+        for block in mixed(waves, nframes, spectral, ordered, nchannels, normalize):
+          writer.write(block)
+      rendered = samples(provisional, mode='r')
+      peak = 0
+      for at in range(0, len(rendered), _blocksize):
+        peak = max(peak, float(np.max(np.abs(rendered[at:at + _blocksize]), initial=0)))
+      gain = peak_gain(peak)
+      with open(fpath, 'wb') as f, WavWriter(f, nchannels=nchannels, framerate=framerate, sampformat=sampformat, nframes=len(rendered)) as writer:
+        for at in range(0, len(rendered), _blocksize):
+          writer.write(gain * rendered[at:at + _blocksize])
+      del rendered
+    finally:
+      if os.path.exists(provisional):
+        os.remove(provisional)
+    return
+  if workers is not None and workers > 1:
+    if nframes is None:
+      raise ValueError('Parallel rendering needs a finite duration.')
+    waves = sorted(waves, key=lambda w: w.offset)
+    position = allocate(fpath, nframes, nchannels=nchannels, framerate=framerate, sampformat=sampformat)
+    # segments are whole numbers of blocks
+    step = _blocksize * max(1, math.ceil(nframes / (_blocksize * workers * _segments)))
+    m = mt.current()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(waves, spectral, nchannels)) as pool:
+      jobs = [pool.submit(_render_segment, fpath, position, start, min(start + step, nframes), sampformat, m is not None) for start in range(0, nframes, step)]
+      for job in jobs:
+        recorded = job.result()
+        if m is not None:
+          segment = mt.Metrics()
+          segment.timings, segment.counters = recorded['timings'], recorded['counters']
+          m.merge(segment)
+    return
+
+  m = mt.current()
+  with open(fpath, 'wb') as f, WavWriter(f, nchannels=nchannels, framerate=framerate, sampformat=sampformat, nframes=nframes) as writer:
+    for block in mixed(waves, nframes, spectral, ordered, nchannels, normalize):
+      if m is None:
+        writer.write(block)
+        continue
+      with m.stage('encoding'):
+        writer.write(block)
   return
@@ -0,0 +1,138 @@
+import struct
+
+import numpy as np
+
+_bufsize = 1 << 20 # bytes gathered before they are handed to the file
+_unknown = 0xFFFFFFFF # size in the header of a stream of unknown length
+
+## sample formats
+  ## name : (bytes per sample, wave format tag, full scale)
+
+_formats = {
+  'int16': (2, 1, 32767),
+  'int24': (3, 1, 8388607),
+  'float32': (4, 3, None),
+  }
+
+def pcm(block, sampformat = 'int16'):
+  # convert a block of float samples in [-1, 1] to little endian bytes of the given format
+  width, _, scale = _formats[sampformat]
+  if scale is None:
+    return np.ascontiguousarray(block, dtype='<f4')
+  samples = np.clip(block, -1, 1) * scale
+  if width == 2:
+    return samples.astype('<i2')
+  # keep the three low bytes of each little endian int32
+  return np.ascontiguousarray(samples.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :width])
+
+def framesize(nchannels, sampformat):
+  # bytes taken by a single frame
+  return nchannels * _formats[sampformat][0]
+
+def header(nframes, nchannels, framerate, sampformat):
+  # riff header of a wav file holding nframes frames, up to the start of the samples
+  # or of an open ended stream for nframes None, whose sizes are left at their largest
+  width, tag, _ = _formats[sampformat]
+  blockalign = framesize(nchannels, sampformat)
+  datasize = _unknown if nframes is None else nframes * blockalign
+  fmt = struct.pack('<HHIIHH', tag, nchannels, framerate, framerate * blockalign, blockalign, 8 * width)
+  extra = b''
+  if tag != 1:
+    # non pcm formats carry an empty extension and a fact chunk
+    fmt += struct.pack('<H', 0)
+    extra = b'fact' + struct.pack('<II', 4, _unknown if nframes is None else nframes)
+  riffsize = _unknown if nframes is None else 4 + (8 + len(fmt)) + len(extra) + (8 + datasize) + datasize % 2
+  return b'RIFF' + struct.pack('<I', riffsize) + b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + extra + b'data' + struct.pack('<I', datasize)
+
+def allocate(fpath, nframes, nchannels = 2, framerate = 48000, sampformat = 'int16'):
+  # create a silent wav file of nframes frames, to be filled in place
+  # returns the position of the first sample in the file
+  head = header(nframes, nchannels, framerate, sampformat)
+  datasize = nframes * framesize(nchannels, sampformat)
+  with open(fpath, 'wb') as f:
+    f.write(head)
+    f.truncate(len(head) + datasize + datasize % 2)
+  return len(head)
+
+def samples(fpath, mode = 'r+'):
+  # memory map the samples of a wav file as an array of shape (frames, channels),
+  # or (frames, channels, 3) bytes for int24, so they can be read or filled in place
+  with open(fpath, 'rb') as f:
+    riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+    if riff != b'RIFF' or wave != b'WAVE':
+      raise ValueError(f'{fpath} is not a wav file.')
+    fmt = None
+    while True:
+      chunk = f.read(8)
+      if len(chunk) < 8:
+        raise ValueError(f'{fpath} holds no samples.')
+      name, size = struct.unpack('<4sI', chunk)
+      if name == b'fmt ':
+        fmt = struct.unpack('<HHIIHH', f.read(16))
+        f.seek(size - 16 + size % 2, 1)
+      elif name == b'data':
+        position = f.tell()
+        break
+      else:
+        f.seek(size + size % 2, 1)
+  if fmt is None:
+    raise ValueError(f'{fpath} holds no format.')
+  tag, nchannels, _, _, _, bits = fmt
+  formats = {(1, 16):'<i2', (1, 24):np.uint8, (3, 32):'<f4', (3, 64):'<f8', (1, 32):'<i4'}
+  if (tag, bits) not in formats:
+    raise ValueError(f'Unsupported sample format in {fpath}.')
+  nframes = size // (nchannels * bits // 8)
+  shape = (nframes, nchannels, 3) if bits == 24 else (nframes, nchannels)
+  return np.memmap(fpath, dtype=formats[tag, bits], mode=mode, offset=position, shape=shape)
+
+class WavWriter():
+  ## writes blocks of float samples into a wav file, one large chunk at a time
+  ## if the number of frames is known upfront, the header is final from the start
+  ## and the file does not need to be seekable, otherwise it is patched on close,
+  ## or for files which cannot seek, such as pipes, written open ended
+
+  def __init__(self, f, nchannels = 2, framerate = 48000, sampformat = 'int16', nframes = None):
+    if sampformat not in _formats:
+      raise ValueError(f'Unknown sample format {sampformat}, expected one of {", ".join(_formats)}.')
+    self.f = f
+    self.nchannels = nchannels
+    self.framerate = framerate
+    self.sampformat = sampformat
+    self.nframes = nframes
+    self.written = 0 # frames written so far
+    self._buffer = bytearray()
+    # a length still unknown is patched on close, or left open ended if the file cannot seek
+    self._seekable = getattr(f, 'seekable', lambda: False)()
+    self.f.write(self.header(0 if nframes is None and self._seekable else nframes))
+
+  def header(self, nframes):
+    return header(nframes, self.nchannels, self.framerate, self.sampformat)
+
+  def write(self, block):
+    # block : array of shape (frames, channels)
+    self._buffer += pcm(block, self.sampformat).data
+    self.written += len(block)
+    if len(self._buffer) >= _bufsize:
+      self.flush()
+
+  def flush(self):
+    self.f.write(self._buffer)
+    self._buffer = bytearray()
+
+  def close(self):
+    self.flush()
+    width = _formats[self.sampformat][0]
+    if (self.written * self.nchannels * width) % 2:
+      self.f.write(b'\x00')
+    if self.written != self.nframes and self._seekable:
+      # the header promised a different length, rewrite it
+      # streams keep theirs, which is open ended unless a length was given upfront
+      self.f.seek(0)
+      self.f.write(self.header(self.written))
+      self.f.seek(0, 2)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
@@ -1,3 +1,5 @@
+import setuptools
+
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
@@ -11,10 +13,12 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/orhid/knuckles",
     packages=setuptools.find_packages(),
+    install_requires=['numpy'],
+    entry_points={'console_scripts':['knuckles=knuckles.cli:main']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
 )
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+
+import numpy as np
+import pytest
+
+import knuckles
+from knuckles import aio
+
+def data(n, seed = 0):
+  rng = np.random.default_rng(seed)
+  return np.sort(rng.uniform(0, 100, n)), rng.normal(size=n), rng.uniform(size=n)
+
+def read(fpath):
+  with open(fpath, 'rb') as f:
+    return f.read()
+
+@pytest.mark.parametrize('settings', [{}, {'mono':True}, {'preview':True}, {'harmonics':3}, {'framerate':22050, 'normalize':'limit'}])
+def test_render_matches_bytes(tmp_path, settings):
+  time, value, space = data(1000)
+  sonif = knuckles.bivar_sq(time, space, value, write=False)
+  asyncio.run(aio.render(sonif, str(tmp_path / 'aio'), **settings))
+  assert read(tmp_path / 'aio.wav') == bytes(sonif.to_bytes(**settings))
+
+def test_encode_forwards_settings(tmp_path):
+  time, value, space = data(300)
+  filename = str(tmp_path / 'encoded')
+  sonif = asyncio.run(aio.encode('bivar_sq', time, space, value, filename=filename, mono=True, framerate=22050))
+  assert read(f'{filename}.wav') == bytes(sonif.to_bytes(mono=True, framerate=22050))
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from knuckles.batch import render_batch
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_failed_jobs_are_isolated(tmp_path, workers):
+  jobs = [
+    ('nulvar_sq_time', (np.arange(10.),), None, str(tmp_path / 'first')),
+    ('no_such_encoder', (np.arange(10.),), None, str(tmp_path / 'unknown')),
+    ('univar_sq_time_freq', (np.arange(10.),), None, str(tmp_path / 'missing')),
+    ('nulvar_sq_freq', (np.arange(10.),), {'shape':'heart'}, str(tmp_path / 'last')),
+    ]
+  reported = []
+  results = render_batch(jobs, workers=workers, callback=reported.append)
+  assert [r['index'] for r in results] == [0, 1, 2, 3]
+  assert sorted(r['index'] for r in reported) == [0, 1, 2, 3]
+  assert [r['error'] is None for r in results] == [True, False, False, True]
+  assert 'Unknown encoder' in results[1]['error']
+  assert os.path.exists(str(tmp_path / 'first.wav')) and os.path.exists(str(tmp_path / 'last.wav'))
+  assert results[3]['metrics']['counters']['frames'] > 0
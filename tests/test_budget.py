@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+import knuckles
+from knuckles import metrics as mt
+from knuckles import source
+
+def chunks(values, size):
+  return source.chunked([values[at:at + size] for at in range(0, len(values), size)])
+
+def peak_voices(sonif, **settings):
+  with mt.record() as metrics:
+    sonif.to_array(**settings)
+  return metrics.counters['peak_voices']
+
+@pytest.mark.parametrize('settings', [{}, {'preview':True}, {'framerate':8000}, {'framerate':44100}])
+@pytest.mark.parametrize('budget', [4, 16, 64])
+def test_budget_holds_at_every_rate(budget, settings):
+  rng = np.random.default_rng(0)
+  sonif = knuckles.univar_sq_time_freq(rng.uniform(size=20000), rng.normal(size=20000), budget=budget, write=False)
+  assert peak_voices(sonif, **settings) <= budget
+
+@pytest.mark.parametrize('settings', [{}, {'framerate':8000}])
+def test_budget_is_shared(settings):
+  rng = np.random.default_rng(0)
+  sonif = knuckles.cmp_freq_nulvar_sq_time([rng.uniform(size=5000) for _ in range(8)], budget=32, write=False)
+  assert peak_voices(sonif, **settings) <= 32
+
+def test_budget_too_small_to_share():
+  with pytest.raises(ValueError):
+    knuckles.cmp_freq_nulvar_sq_time([np.arange(10.)] * 8, budget=16, write=False)
+
+def test_framerate_too_low():
+  sonif = knuckles.nulvar_sq_time(np.arange(10.), write=False)
+  with pytest.raises(ValueError):
+    sonif.to_array(framerate=4000)
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_chunked_budget_matches_arrays(ordered):
+  rng = np.random.default_rng(0)
+  time, value = rng.uniform(0, 100, 5000), rng.normal(size=5000)
+  if ordered:
+    time = np.sort(time)
+  a = knuckles.univar_sq_time_freq(time, value, budget=16, write=False)
+  b = knuckles.univar_sq_time_freq(chunks(time, 1000), chunks(value, 777), budget=16, write=False)
+  assert bytes(a.to_bytes()) == bytes(b.to_bytes())
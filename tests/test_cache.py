@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from knuckles import encryptor
+from knuckles.cache import RenderCache
+
+calls = []
+
+def counted(value, filename = 'counted', write = True):
+  # an encoder which records every time it actually renders
+  calls.append(filename)
+  return encryptor.nulvar_sq_time(value, filename=filename, write=write)
+
+def entries(cache):
+  return sorted(name for name in os.listdir(cache.directory) if name.endswith('.wav') and not name.startswith('.'))
+
+def test_hit_copies_the_stored_render(tmp_path):
+  cache = RenderCache(str(tmp_path / 'cache'))
+  calls.clear()
+  first = cache.render(counted, np.arange(10.), filename=str(tmp_path / 'a'))
+  second = cache.render(counted, np.arange(10.), filename=str(tmp_path / 'b'))
+  assert len(calls) == 1
+  with open(first, 'rb') as a, open(second, 'rb') as b:
+    assert a.read() == b.read()
+
+def test_miss_on_other_data_or_arguments(tmp_path):
+  cache = RenderCache(str(tmp_path / 'cache'))
+  calls.clear()
+  cache.render(counted, np.arange(10.), filename=str(tmp_path / 'a'))
+  cache.render(counted, np.arange(11.), filename=str(tmp_path / 'b'))
+  cache.render(encryptor.nulvar_sq_time, np.arange(10.), filename=str(tmp_path / 'c'), frequency=440)
+  assert len(calls) == 2
+  assert len(entries(cache)) == 3
+
+def test_eviction_keeps_the_latest(tmp_path):
+  cache = RenderCache(str(tmp_path / 'cache'))
+  cache.render(counted, np.arange(10.), filename=str(tmp_path / 'a'))
+  size = os.path.getsize(str(tmp_path / 'a.wav'))
+  cache.maxsize = size
+  cache.render(counted, np.arange(11.), filename=str(tmp_path / 'b'))
+  assert entries(cache) == [os.path.basename(cache.path(cache.key(counted, [np.arange(11.)], {})))]
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+import knuckles
+from knuckles import cli
+
+def write_csv(fpath, columns):
+  with open(fpath, 'w') as f:
+    f.write(','.join(columns) + '\n')
+    f.writelines(','.join(repr(float(v)) for v in row) + '\n' for row in zip(*columns.values()))
+
+def test_renders_every_file(tmp_path, capsys):
+  rng = np.random.default_rng(0)
+  columns = [{'t':np.sort(rng.uniform(size=300)), 'x':rng.uniform(size=300), 'y':rng.normal(size=300)} for _ in range(2)]
+  for i, values in enumerate(columns):
+    write_csv(str(tmp_path / f'data{i}.csv'), values)
+  files = [str(tmp_path / f'data{i}.csv') for i in range(2)]
+  code = cli.main(['bivar_sq', *files, '--time', 't', '--space', 'x', '--value', 'y', '--output-dir', str(tmp_path / 'out'), '--workers', '1', '--chunksize', '100'])
+  assert code == 0
+  assert 'frames/s' in capsys.readouterr().out
+  for i, values in enumerate(columns):
+    expected = knuckles.bivar_sq(values['t'], values['x'], values['y'], write=False).to_bytes()
+    with open(tmp_path / 'out' / f'data{i}.wav', 'rb') as f:
+      assert f.read() == bytes(expected)
+
+def test_binary_columns(tmp_path):
+  rng = np.random.default_rng(0)
+  rows = rng.uniform(size=(200, 3))
+  rows.tofile(str(tmp_path / 'rows.bin'))
+  code = cli.main(['univar_sq_time_freq', str(tmp_path / 'rows.bin'), '--time', '0', '--value', '2', '--output-dir', str(tmp_path), '--workers', '1'])
+  assert code == 0
+  expected = knuckles.univar_sq_time_freq(rows[:, 0], rows[:, 2], write=False).to_bytes()
+  with open(tmp_path / 'rows.wav', 'rb') as f:
+    assert f.read() == bytes(expected)
+
+def test_failures_are_reported(tmp_path):
+  write_csv(str(tmp_path / 'data.csv'), {'t':np.arange(10.)})
+  assert cli.main(['nulvar_sq_time', str(tmp_path / 'data.csv'), '--value', 'missing', '--output-dir', str(tmp_path), '--workers', '1']) == 1
+
+def test_unknown_sample_format(tmp_path):
+  with pytest.raises(SystemExit):
+    cli.main(['nulvar_sq_time', 'data.csv', '--value', '0', '--sampformat', 'int32'])
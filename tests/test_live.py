@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+
+import numpy as np
+
+import knuckles
+from knuckles.live import LiveSonification
+from knuckles.wavfile import samples
+
+def data(n, seed = 0):
+  rng = np.random.default_rng(seed)
+  return np.sort(rng.uniform(0, 100, n)), rng.normal(size=n)
+
+def test_live_matches_render(tmp_path):
+  time, value = data(3000)
+  bounds = {'time_bounds':(0, 100), 'value_bounds':(value.min(), value.max())}
+  knuckles.univar_sq_time_freq(time, value, filename=str(tmp_path / 'full'), **bounds)
+  with LiveSonification('univar_sq_time_freq', str(tmp_path / 'live'), **bounds) as live:
+    for at in range(0, len(time), 137):
+      live.append(time[at:at + 137], value[at:at + 137])
+  full = samples(str(tmp_path / 'full.wav'), mode='r')
+  incremental = samples(str(tmp_path / 'live.wav'), mode='r')
+  assert np.array_equal(full[:len(incremental)], incremental)
+  assert not np.any(full[len(incremental):])
+
+def test_live_to_stream_is_readable():
+  # a stream which cannot seek keeps an open ended header
+  class Pipe(io.BytesIO):
+    def seekable(self):
+      return False
+  time, value = data(300)
+  pipe = Pipe()
+  with LiveSonification('univar_sq_time_freq', pipe, time_bounds=(0, 100), value_bounds=(value.min(), value.max())) as live:
+    live.append(time, value)
+  head = pipe.getvalue()[:44]
+  assert head[4:8] == b'\xff\xff\xff\xff' and head[40:44] == b'\xff\xff\xff\xff'
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+
+import numpy as np
+
+import knuckles
+from knuckles import metrics as mt
+from knuckles import wave as wv
+
+def sonification():
+  rng = np.random.default_rng(0)
+  return knuckles.nulvar_sq_time(rng.uniform(size=500), write=False)
+
+def test_counters():
+  sonif = sonification()
+  with mt.record() as metrics:
+    samples = sonif.to_array()
+  assert metrics.counters['frames'] == len(samples)
+  assert metrics.counters['voices'] == len(list(sonif.voices()))
+  assert 0 < metrics.counters['peak_voices'] <= metrics.counters['voices']
+  assert metrics.timings['synthesis'] > 0
+
+def test_nested_recordings_merge():
+  sonif = sonification()
+  with mt.record() as outer:
+    with mt.record() as inner:
+      sonif.to_array()
+    sonif.to_array()
+  assert outer.counters['frames'] == 2 * inner.counters['frames']
+
+def test_recordings_on_threads_stay_apart():
+  sonif = sonification()
+  frames = {}
+  def render(name):
+    with mt.record() as metrics:
+      sonif.to_array()
+    frames[name] = metrics.counters['frames']
+  with mt.record() as outer:
+    threads = [threading.Thread(target=render, args=(i,)) for i in range(3)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+  assert len(set(frames.values())) == 1
+  assert 'frames' not in outer.counters
+
+def test_blocks_report_where_they_were_made():
+  sonif = sonification()
+  with mt.record() as metrics:
+    blocks = wv.compute_blocks(sonif.voices(), 48000, ordered=True)
+  for _ in blocks:
+    pass
+  assert metrics.counters['frames'] == 48000
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+import knuckles
+from knuckles.wavfile import samples
+
+def data(n, seed = 0):
+  rng = np.random.default_rng(seed)
+  return np.sort(rng.uniform(0, 100, n)), rng.normal(size=n)
+
+def read(fpath):
+  with open(fpath, 'rb') as f:
+    return f.read()
+
+@pytest.mark.parametrize('settings', [{}, {'sampformat':'int24'}, {'mono':True}, {'preview':True}, {'normalize':'limit'}])
+def test_bytes_match_render(tmp_path, settings):
+  time, value = data(2000)
+  sonif = knuckles.univar_sq_time_freq(time, value, write=False)
+  sonif.render(str(tmp_path / 'render'), **settings)
+  assert read(tmp_path / 'render.wav') == bytes(sonif.to_bytes(**settings))
+
+def test_array_matches_render(tmp_path):
+  time, value = data(2000)
+  sonif = knuckles.univar_sq_time_freq(time, value, write=False)
+  sonif.render(str(tmp_path / 'render'))
+  assert np.array_equal(samples(str(tmp_path / 'render.wav'), mode='r'), sonif.to_array('int16'))
+
+def test_memmap_matches_array(tmp_path):
+  time, value = data(500)
+  sonif = knuckles.univar_sq_time_freq(time, value, write=False)
+  assert np.array_equal(sonif.to_memmap(str(tmp_path / 'mapped')), sonif.to_array('int16'))
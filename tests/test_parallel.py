@@ -0,0 +1,43 @@
+'''
+regression checks that rendering in parallel gives the same samples as a serial render
+
+  python -m pytest tests
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+import knuckles
+from knuckles import wave as wv
+
+def data(n, seed = 0):
+  rng = np.random.default_rng(seed)
+  return np.sort(rng.uniform(0, 100, n)), rng.normal(size=n), rng.uniform(size=n)
+
+def read(fpath):
+  with open(fpath, 'rb') as f:
+    return f.read()
+
+## parallel rendering
+
+@pytest.mark.parametrize('sampformat', ['int16', 'int24', 'float32'])
+def test_parallel_matches_serial(tmp_path, sampformat):
+  time, value, space = data(2000)
+  sonif = knuckles.bivar_sq(time, space, value, write=False)
+  waves = list(sonif.voices())
+  wv.write(str(tmp_path / 'serial.wav'), waves, sonif.duration, sampformat=sampformat, ordered=True)
+  wv.write(str(tmp_path / 'parallel.wav'), waves, sonif.duration, sampformat=sampformat, ordered=True, workers=3)
+  assert read(tmp_path / 'serial.wav') == read(tmp_path / 'parallel.wav')
+
+def test_parallel_matches_serial_spectral(tmp_path):
+  _, value, _ = data(500)
+  sonif = knuckles.nulvar_ns(value, duration=1.3, spectral=True, write=False)
+  waves = list(sonif.voices())
+  wv.write(str(tmp_path / 'serial.wav'), waves, sonif.duration, spectral=True)
+  wv.write(str(tmp_path / 'parallel.wav'), waves, sonif.duration, spectral=True, workers=3)
+  assert read(tmp_path / 'serial.wav') == read(tmp_path / 'parallel.wav')
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from knuckles import source
+from knuckles.projection import project
+
+def rows(n, dimensions, seed = 0):
+  rng = np.random.default_rng(seed)
+  return rng.normal(size=(n, dimensions)) @ rng.normal(size=(dimensions, dimensions))
+
+@pytest.mark.parametrize('method', ['pca', 'random'])
+def test_chunked_matches_whole(tmp_path, method):
+  points = rows(5000, 6)
+  points.tofile(str(tmp_path / 'points.bin'))
+  x, y = project(points, method)
+  cx, cy = project(source.read_binary(str(tmp_path / 'points.bin'), chunksize=999, columns=6), method)
+  assert np.allclose(np.concatenate(list(cx.chunks())), x)
+  assert np.allclose(np.concatenate(list(cy.chunks())), y)
+
+def test_pca_keeps_the_most_variance():
+  points = rows(2000, 4)
+  x, y = project(points)
+  variance = np.var(points - points.mean(axis=0), axis=0).sum()
+  assert np.var(x) >= np.var(y)
+  assert np.var(x) + np.var(y) <= variance + 1e-9
+  assert np.var(x) >= np.linalg.eigvalsh(np.cov(points.T, bias=True))[-1] * (1 - 1e-9)
+
+@pytest.mark.parametrize('method', ['pca', 'random'])
+def test_single_dimension(method):
+  x, y = project(np.arange(5.).reshape(-1, 1), method)
+  assert np.allclose(np.abs(x - x.mean()), np.abs(np.arange(5.) - 2)) and not np.any(y)
@@ -0,0 +1,60 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+import threading
+
+import numpy as np
+import pytest
+
+import knuckles
+from knuckles import realtime
+
+def data(n, seed = 0):
+  rng = np.random.default_rng(seed)
+  return np.sort(rng.uniform(0, 100, n)), rng.normal(size=n), rng.uniform(size=n)
+
+def sonification(n):
+  time, value, space = data(n)
+  return knuckles.bivar_sq(time, space, value, write=False)
+
+@pytest.mark.parametrize('settings', [{}, {'mono':True}, {'preview':True}, {'harmonics':3}, {'framerate':22050, 'normalize':'limit'}])
+def test_stream_matches_bytes(settings):
+  sonif = sonification(1000)
+  sink = io.BytesIO()
+  realtime.stream(sonif, sink, realtime=False, **settings)
+  assert sink.getvalue() == bytes(sonif.to_bytes(**settings))
+
+@pytest.mark.parametrize('normalize', [None, 'limit'])
+@pytest.mark.parametrize('blocksize', [1000, 3333])
+def test_stream_blocksize(blocksize, normalize):
+  # mixing and limiting do not depend on how the timeline is cut into blocks
+  sonif = sonification(1000)
+  sink = io.BytesIO()
+  realtime.stream(sonif, sink, blocksize=blocksize, realtime=False, normalize=normalize)
+  assert sink.getvalue() == bytes(sonif.to_bytes(normalize=normalize))
+
+def test_stream_unknown_normalization():
+  with pytest.raises(ValueError):
+    realtime.stream(sonification(100), io.BytesIO(), realtime=False, normalize='limiter')
+
+def test_ring_buffer_passes_every_byte():
+  sonif = sonification(300)
+  ring = realtime.RingBuffer(1 << 16)
+  received = bytearray()
+  def player():
+    # reads only what is held, so that none is padded with silence
+    while True:
+      held = len(ring)
+      if held:
+        received.extend(ring.read(min(held, 4096)))
+      elif ring.closed:
+        return
+  thread = threading.Thread(target=player)
+  thread.start()
+  realtime.stream(sonif, ring, realtime=False, wav=False)
+  ring.close()
+  thread.join()
+  assert bytes(received) == bytes(sonif.to_bytes())[44:]
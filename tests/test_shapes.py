@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from knuckles import wave as wv
+
+@pytest.mark.parametrize('framerate', [8000, 12000, 48000])
+@pytest.mark.parametrize('shape', ['saw', 'square', 'heart', 'funnel'])
+def test_harmonics_stay_below_nyquist(shape, framerate):
+  for frequency in [300, 1000, 3456, 5000, 8000]:
+    period = frequency / framerate
+    partials = wv.partials(shape, period)
+    if partials is None or period >= wv._band:
+      continue
+    multiples, _ = partials
+    assert multiples.max() * period <= wv._band
+
+def test_band_keeps_the_fundamental():
+  assert wv.band(0.45, 1) == 1
+  assert wv.band(0.001, 2, limit=3) == 3
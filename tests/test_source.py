@@ -0,0 +1,32 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import knuckles
+from knuckles import source
+
+def data(n, seed = 0):
+  rng = np.random.default_rng(seed)
+  return np.sort(rng.uniform(0, 100, n)), rng.normal(size=n), rng.uniform(size=n)
+
+def chunks(values, size):
+  return source.chunked([values[at:at + size] for at in range(0, len(values), size)])
+
+def test_chunked_matches_arrays():
+  time, value, space = data(5000)
+  a = knuckles.bivar_sq(time, space, value, write=False)
+  b = knuckles.bivar_sq(chunks(time, 1000), chunks(space, 777), value, write=False)
+  assert bytes(a.to_bytes()) == bytes(b.to_bytes())
+
+def test_files_match_arrays(tmp_path):
+  time, value, _ = data(3000)
+  time.tofile(str(tmp_path / 'time.bin'))
+  with open(tmp_path / 'data.csv', 'w') as f:
+    f.write('time,value\n')
+    f.writelines(f'{float(t)!r},{float(v)!r}\n' for t, v in zip(time, value))
+  a = knuckles.univar_sq_time_freq(time, value, write=False)
+  b = knuckles.univar_sq_time_freq(source.read_binary(str(tmp_path / 'time.bin'), chunksize=1000), source.read_csv(str(tmp_path / 'data.csv'), 'value', header=True, chunksize=777), write=False)
+  assert bytes(a.to_bytes()) == bytes(b.to_bytes())
@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import math
+
+import numpy as np
+
+import knuckles
+from knuckles.spectral import SpectralBank
+
+def test_partials_within_tolerance():
+  # every partial is within 0.25% of its amplitude, wherever the block starts
+  rng = np.random.default_rng(0)
+  for period, amplitude in zip(rng.uniform(20, 20000, 40) / 48000, rng.uniform(0.1, 1, 40)):
+    bank = SpectralBank([period], [[amplitude, -amplitude]])
+    frames = np.arange(5000, 15000)
+    expected = amplitude * np.sin(math.tau * period * frames)
+    block = bank.block(5000, len(frames))
+    assert np.abs(block[:, 0] - expected).max() <= 0.0025 * amplitude
+    assert np.abs(block[:, 1] + expected).max() <= 0.0025 * amplitude
+
+def test_spectral_render_close_to_time_domain():
+  rng = np.random.default_rng(0)
+  value = rng.normal(size=50)
+  sines = knuckles.nulvar_ns(value, duration=1, amplitude=0.01, write=False)
+  spectral = knuckles.nulvar_ns(value, duration=1, amplitude=0.01, write=False, spectral=True)
+  # each of the 50 partials may be off by 0.25% of its amplitude
+  assert np.abs(sines.to_array('float64') - spectral.to_array('float64')).max() <= 50 * 0.01 * 0.0025 * 1.01